@@ -0,0 +1,370 @@
+"""
+Convert a whole directory tree of documents to Markdown from the command line.
+
+Every supported file under the input directory is converted by a process pool
+through the same convert_*_to_md functions the Streamlit app uses. The output
+tree mirrors the input tree: docs/a/report.pdf becomes out/a/report.md, with
+its images in out/a/images.
+
+Each worker enforces a per-file time limit and an address-space cap. One JSON
+line per finished file (status, duration, error, per-stage timings) is appended
+to a manifest in the output directory, so an interrupted run picks up where it
+stopped.
+Files already converted anywhere (by this tool or the Streamlit app) are restored
+from the shared result cache, see converters/cache.py.
+
+Usage:
+    python batch_convert.py docs/ out/
+    python batch_convert.py docs/ out/ --workers 8 --timeout 300 --memory-mb 2048
+    python batch_convert.py docs/ out/ --retry-failed
+    python batch_convert.py docs/ out/ --pages "last 10" --slides 1-5
+    python batch_convert.py docs/ out/ --archive zip
+
+With --archive, each document becomes a single out/a/report.zip (or .tar, .tar.gz)
+holding report.md and its images/, instead of loose files.
+"""
+import argparse
+import json
+import os
+import signal
+import sys
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from converters import get_converter, page_selector, supported_formats
+from converters.archive import ARCHIVE_FORMATS, ARCHIVE_SUFFIXES, MarkdownArchive
+from converters.cache import DEFAULT_CACHE_DIR, DEFAULT_CACHE_MB, ResultCache
+from converters.profiling import collect_report
+
+MANIFEST_NAME = "manifest.jsonl"
+DEFAULT_TIMEOUT = 600
+DEFAULT_MEMORY_MB = 4096
+IMAGE_FORMATS = ("png", "jpg", "jpeg")
+
+
+class ConversionTimeout(BaseException):
+    """
+    Raised inside a worker when a file runs past its time limit.
+    Derives from BaseException so the converters' own `except Exception` handlers let it through.
+    """
+
+
+def _raise_timeout(signum, frame):
+    raise ConversionTimeout()
+
+
+def init_worker(memory_mb):
+    """
+    Process pool initializer: cap the worker's address space and install the timeout handler.
+    """
+    if memory_mb:
+        import resource
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    signal.signal(signal.SIGALRM, _raise_timeout)
+
+
+def iter_input_files(input_dir):
+    """
+    Yield every file under input_dir with a registered converter, in a stable order.
+    """
+    formats = set(supported_formats())
+    for root, dirs, files in os.walk(input_dir):
+        dirs.sort()
+        for file_name in sorted(files):
+            if os.path.splitext(file_name)[1].lower().lstrip(".") in formats:
+                yield Path(root) / file_name
+
+
+def selection_for(file_path, selections):
+    """
+    The converter keyword and value selecting pages or slides of file_path, as a dict ({} for the whole file).
+    selections maps "pages" and "slides" to the selections given on the command line.
+    """
+    selector = page_selector(file_path.suffix)
+    if selector is None or (selections or {}).get(selector) is None:
+        return {}
+    return {selector: selections[selector]}
+
+
+def convert_file(file_path, md_path, images_dir, cache=None, selections=None, archive_format=None):
+    """
+    Convert one file with the converter registered for its extension and write md_path.
+    selections ({"pages": ..., "slides": ...}) limits PDFs and PPTX files to some pages or slides.
+    With a ResultCache, a previously seen input is restored from it instead of converted.
+    With archive_format, the markdown and its images go into one archive at md_path with the
+    archive's suffix; they are staged in a local temporary folder, not in images_dir.
+    Returns True on a cache hit. Raises RuntimeError if there is no converter or it reports a failure;
+    a MemoryError from the converter is passed through.
+    """
+    if archive_format is not None:
+        with tempfile.TemporaryDirectory(prefix="md-archive-") as staging_dir:
+            staged_md_path = Path(staging_dir) / md_path.name
+            staged_images_dir = Path(staging_dir) / "images"
+            cached = convert_file(file_path, staged_md_path, staged_images_dir, cache, selections)
+            with open(staged_md_path, "r", encoding="utf-8") as md_file, \
+                    MarkdownArchive(md_path.with_suffix(ARCHIVE_SUFFIXES[archive_format]), archive_format) as archive:
+                archive.write_markdown(md_path.name, md_file, separator="")
+                archive.add_images_dir(staged_images_dir)
+        return cached
+
+    file_ext = file_path.suffix.lower().lstrip(".")
+    selection = selection_for(file_path, selections)
+    if cache is not None:
+        # Same options as JobQueue.submit, so batch runs and the app share cached selections
+        cache_key = cache.key(file_path, file_ext, {"pages": list(selection.values())[0]} if selection else None)
+        markdown = cache.get(cache_key, images_dir)
+        if markdown is not None:
+            with open(md_path, "w", encoding="utf-8") as md_file:
+                md_file.write(markdown)
+            return True
+
+    convert = get_converter(file_ext)
+    if convert is None:
+        raise RuntimeError(f"No converter available for .{file_ext}")
+
+    if file_ext in IMAGE_FORMATS:
+        # The image converter names the .md after `name` and keeps images next to it
+        result = convert(str(file_path), output_dir=str(md_path.parent), name=md_path.stem + file_path.suffix)
+    else:
+        result = convert(str(file_path), str(md_path), str(images_dir), **selection)
+
+    if result is None:
+        raise RuntimeError("Converter reported an error (see worker output)")
+
+    if cache is not None:
+        with open(md_path, "r", encoding="utf-8") as md_file:
+            cache.put(cache_key, md_file.read(), images_dir)
+    return False
+
+
+def run_job(file_path, md_path, images_dir, timeout, cache_dir=None, cache_mb=DEFAULT_CACHE_MB, trace_memory=False,
+            selections=None, archive_format=None):
+    """
+    Worker entry point: convert one file under the time limit.
+    Returns a dict with status ("ok", "error", "timeout" or "memory"), seconds, error, cached
+    and the per-stage report (see converters/profiling.py).
+    """
+    md_path.parent.mkdir(parents=True, exist_ok=True)
+    cache = ResultCache(cache_dir, cache_mb) if cache_dir else None
+
+    start = time.perf_counter()
+    status, error, cached = "ok", None, False
+    if timeout:
+        signal.alarm(timeout)
+    try:
+        with collect_report(trace_memory) as report:
+            cached = convert_file(file_path, md_path, images_dir, cache, selections, archive_format)
+    except ConversionTimeout:
+        status, error = "timeout", f"Exceeded {timeout}s"
+    except MemoryError:
+        status, error = "memory", "Exceeded the memory cap"
+    except Exception as e:
+        status, error = "error", str(e)
+    finally:
+        signal.alarm(0)
+
+    return {"status": status, "seconds": round(time.perf_counter() - start, 3), "error": error, "cached": cached,
+            "report": report.as_dict()}
+
+
+def output_md_path(output_dir, rel_path, shared_stems):
+    """
+    Where the markdown for an input file goes: the same relative path with a .md suffix.
+    Files sharing a stem in one folder (report.pdf and report.docx) get the extension
+    folded into the name (report_pdf.md, report_docx.md) so they do not overwrite each other.
+    """
+    rel_path = Path(rel_path)
+    stem = rel_path.stem
+    if (rel_path.parent, stem.lower()) in shared_stems:
+        stem = f"{stem}_{rel_path.suffix.lstrip('.').lower()}"
+    return output_dir / rel_path.parent / f"{stem}.md"
+
+
+def find_shared_stems(rel_paths):
+    """
+    (folder, lower-cased stem) pairs used by more than one input file.
+    """
+    seen, shared = set(), set()
+    for rel_path in rel_paths:
+        key = (Path(rel_path).parent, Path(rel_path).stem.lower())
+        if key in seen:
+            shared.add(key)
+        seen.add(key)
+    return shared
+
+
+def file_signature(file_path):
+    """
+    Size and modification time of a file, used to tell whether a manifest entry is stale.
+    """
+    stat = file_path.stat()
+    return stat.st_size, stat.st_mtime_ns
+
+
+def load_manifest(manifest_path):
+    """
+    Read a manifest into {relative path: last record}. Later lines win; a torn last line is ignored.
+    """
+    records = {}
+    if not manifest_path.exists():
+        return records
+
+    with open(manifest_path, "r", encoding="utf-8") as manifest:
+        for line in manifest:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            records[record["path"]] = record
+    return records
+
+
+def is_done(record, signature, retry_failed, selection=None, archive_format=None):
+    """
+    Whether a manifest record means the file can be skipped on this run.
+    A file converted with a different page or slide selection, or archive format, is converted again.
+    """
+    if record is None or (record.get("size"), record.get("mtime_ns")) != signature:
+        return False
+    if record.get("selection", {}) != (selection or {}) or record.get("archive") != archive_format:
+        return False
+    return record["status"] == "ok" or not retry_failed
+
+
+def convert_directory(input_dir, output_dir, workers=None, timeout=DEFAULT_TIMEOUT, memory_mb=DEFAULT_MEMORY_MB,
+                      retry_failed=False, cache_dir=DEFAULT_CACHE_DIR, cache_mb=DEFAULT_CACHE_MB, trace_memory=False,
+                      pages=None, slides=None, archive_format=None):
+    """
+    Convert every supported file under input_dir into output_dir, resuming from the manifest.
+    pages and slides limit every PDF and PPTX file to a page or slide selection ("1-20", "last 5").
+    archive_format ("zip", "tar" or "tar.gz") writes one archive per file instead of .md files and images.
+    Results are shared through the ResultCache in cache_dir (None disables it).
+    Each manifest line carries the file's per-stage report; trace_memory adds peak allocations.
+    Returns a dict counting files per status, plus "skipped" for files finished on an earlier run.
+    """
+    input_dir, output_dir = Path(input_dir), Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = output_dir / MANIFEST_NAME
+    done = load_manifest(manifest_path)
+    workers = workers or os.cpu_count() or 1
+
+    files = [(file_path, file_path.relative_to(input_dir).as_posix()) for file_path in iter_input_files(input_dir)]
+    shared_stems = find_shared_stems(rel for _, rel in files)
+    selections = {"pages": pages, "slides": slides}
+    file_selections = {rel: selection_for(file_path, selections) for file_path, rel in files}
+
+    counts = {"skipped": 0}
+    pending = []
+    for file_path, rel in files:
+        signature = file_signature(file_path)
+        if is_done(done.get(rel), signature, retry_failed, file_selections[rel], archive_format):
+            counts["skipped"] += 1
+        else:
+            pending.append((file_path, rel, signature))
+
+    print(f"{len(pending)} file(s) to convert, {counts['skipped']} already done")
+
+    with open(manifest_path, "a", encoding="utf-8") as manifest:
+        def record(rel, signature, result):
+            entry = {"path": rel, "size": signature[0], "mtime_ns": signature[1], **result}
+            if file_selections[rel]:
+                entry["selection"] = file_selections[rel]
+            if archive_format:
+                entry["archive"] = archive_format
+            manifest.write(json.dumps(entry) + "\n")
+            manifest.flush()
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+            status = "cached" if result.get("cached") else result["status"]
+            print(f"[{status}] {rel} ({result['seconds']}s)" + (f": {result['error']}" if result["error"] else ""))
+
+        queue = iter(pending)
+        while True:
+            # A worker killed outright (e.g. by the OOM killer) breaks the pool; record its files and start a new one
+            with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(memory_mb,)) as pool:
+                in_flight = {}
+                broken = False
+                for file_path, rel, signature in queue:
+                    md_path = output_md_path(output_dir, rel, shared_stems)
+                    try:
+                        future = pool.submit(run_job, file_path, md_path, md_path.parent / "images", timeout,
+                                             cache_dir, cache_mb, trace_memory, selections, archive_format)
+                    except BrokenProcessPool:
+                        record(rel, signature, {"status": "crashed", "seconds": 0.0, "error": "Worker process died"})
+                        broken = True
+                        break
+                    in_flight[future] = (rel, signature, time.perf_counter())
+                    if len(in_flight) >= workers * 2:
+                        broken = _drain(in_flight, record, FIRST_COMPLETED)
+                        if broken:
+                            break
+                if broken:
+                    _drain(in_flight, record)
+                else:
+                    broken = _drain(in_flight, record)
+            if not broken:
+                break
+
+    return counts
+
+
+def _drain(in_flight, record, return_when="ALL_COMPLETED"):
+    """
+    Wait for in-flight jobs and record the finished ones. Returns True if the pool broke.
+    """
+    done, _ = wait(in_flight, return_when=return_when)
+    broken = False
+    for future in done:
+        rel, signature, started = in_flight.pop(future)
+        try:
+            result = future.result()
+        except BrokenProcessPool:
+            broken = True
+            result = {"status": "crashed", "seconds": round(time.perf_counter() - started, 3),
+                      "error": "Worker process died"}
+        record(rel, signature, result)
+
+    if broken:
+        # Jobs still queued on the dead pool will never run; record them as crashed too
+        for future, (rel, signature, started) in list(in_flight.items()):
+            in_flight.pop(future)
+            record(rel, signature, {"status": "crashed", "seconds": round(time.perf_counter() - started, 3),
+                                    "error": "Worker process died"})
+    return broken
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert a directory tree of documents to Markdown.")
+    parser.add_argument("input_dir", help="directory to scan for PDF, DOCX, PPTX and image files")
+    parser.add_argument("output_dir", help="directory for the .md files, images and manifest")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--timeout", type=int, default=DEFAULT_TIMEOUT, help="seconds per file, 0 for no limit")
+    parser.add_argument("--memory-mb", type=int, default=DEFAULT_MEMORY_MB,
+                        help="address-space cap per worker in MB, 0 for no limit")
+    parser.add_argument("--retry-failed", action="store_true",
+                        help="reconvert files that failed or timed out on an earlier run")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help="result cache shared with the Streamlit app (default: %(default)s)")
+    parser.add_argument("--cache-mb", type=int, default=DEFAULT_CACHE_MB, help="result cache size limit in MB")
+    parser.add_argument("--no-cache", action="store_true", help="always convert, bypassing the result cache")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="record peak allocation per stage in the manifest (slower)")
+    parser.add_argument("--pages", default=None,
+                        help='convert only these PDF pages, e.g. "1-20", "3,7,9-12", "40-" or "last 5"')
+    parser.add_argument("--slides", default=None, help="convert only these PPTX slides, same syntax as --pages")
+    parser.add_argument("--archive", choices=ARCHIVE_FORMATS, default=None,
+                        help="write each document and its images as one archive instead of loose files")
+    args = parser.parse_args(argv)
+
+    counts = convert_directory(args.input_dir, args.output_dir, args.workers, args.timeout, args.memory_mb,
+                               args.retry_failed, None if args.no_cache else args.cache_dir, args.cache_mb,
+                               args.trace_memory, args.pages, args.slides, args.archive)
+    print(", ".join(f"{status}: {count}" for status, count in counts.items()))
+    return 0 if set(counts) <= {"ok", "skipped"} else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,233 @@
+"""
+Generate a reproducible synthetic corpus for the converter benchmarks.
+
+Builds PDFs with PyMuPDF, DOCX files with python-docx, PPTX files with
+python-pptx and table images with OpenCV, plus "scanned" PDFs whose pages are
+only images of the text PDF's pages. Every document size is one "unit"
+count (PDF pages, DOCX sections, PPTX slides, image table rows), with a ruled
+table every --table-every units and an embedded image every --image-every
+units. The same arguments always produce the same content.
+
+Usage:
+    python benchmarks/corpus.py out/corpus
+    python benchmarks/corpus.py out/corpus --sizes 10 100 --table-every 2 --image-every 4
+"""
+import argparse
+import io
+import os
+import random
+
+import cv2
+import fitz  # PyMuPDF
+import numpy as np
+from docx import Document
+from pptx import Presentation
+from pptx.util import Inches
+
+DEFAULT_SIZES = [10, 50, 200]
+DEFAULT_TABLE_EVERY = 3
+DEFAULT_IMAGE_EVERY = 5
+
+# Paragraphs per DOCX section
+DOCX_PARAGRAPHS_PER_UNIT = 20
+
+# Resolution the pages of a scanned PDF are rasterized at
+SCAN_DPI = 200
+
+WORDS = ("contract", "party", "payment", "invoice", "clause", "delivery", "term", "notice", "schedule",
+         "amount", "agreement", "service", "period", "liability", "annex", "total", "date", "value")
+
+
+def sentence(rng, words=12):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def build_image_bytes(rng, index, size=96):
+    """
+    A small PNG with a distinct pattern per index, so images do not deduplicate.
+    """
+    img = np.full((size, size, 3), 255, dtype=np.uint8)
+    color = tuple(int(c) for c in rng.integers(0, 200, 3))
+    cv2.rectangle(img, (8, 8), (size - 8, size - 8), color, -1)
+    cv2.putText(img, str(index), (14, size // 2 + 8), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+    return cv2.imencode(".png", img)[1].tobytes()
+
+
+def table_cells(rng, rows, cols):
+    return [[f"{rng.choice(WORDS)} {r}.{c}" for c in range(cols)] for r in range(rows)]
+
+
+def build_pdf(path, pages, table_every=DEFAULT_TABLE_EVERY, image_every=DEFAULT_IMAGE_EVERY, seed=0):
+    """
+    Write a PDF with prose, a link on every page, a ruled 4x3 table every table_every pages
+    and an image every image_every pages.
+    """
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed)
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Section {i + 1}", fontsize=16)
+        uri = f"https://example.com/doc/{i + 1}"
+        page.insert_text((72, 96), f"See {uri}", fontsize=10)
+        page.insert_link({"kind": fitz.LINK_URI, "from": fitz.Rect(72, 86, 300, 100), "uri": uri})
+
+        y = 130
+        for _ in range(6):
+            page.insert_textbox(fitz.Rect(72, y, 520, y + 40), sentence(rng, 18), fontsize=10)
+            y += 44
+
+        if table_every and i % table_every == 0:
+            x0, y0, cell_w, cell_h = 72, y + 10, 140, 22
+            rows, cols = 4, 3
+            for r in range(rows + 1):
+                page.draw_line((x0, y0 + r * cell_h), (x0 + cols * cell_w, y0 + r * cell_h))
+            for c in range(cols + 1):
+                page.draw_line((x0 + c * cell_w, y0), (x0 + c * cell_w, y0 + rows * cell_h))
+            for r, row in enumerate(table_cells(rng, rows, cols)):
+                for c, cell in enumerate(row):
+                    page.insert_text((x0 + 6 + c * cell_w, y0 + 15 + r * cell_h), cell, fontsize=9)
+            y = y0 + rows * cell_h + 20
+
+        if image_every and i % image_every == 0:
+            page.insert_image(fitz.Rect(72, y + 10, 168, y + 106), stream=build_image_bytes(np_rng, i))
+
+    doc.save(path)
+    doc.close()
+
+
+def build_scanned_pdf(path, pages, table_every=DEFAULT_TABLE_EVERY, image_every=DEFAULT_IMAGE_EVERY, seed=0,
+                      dpi=SCAN_DPI):
+    """
+    Write a PDF like build_pdf's, but with every page replaced by a grayscale image of it and no text layer.
+    """
+    build_pdf(path, pages, table_every, image_every, seed)
+    scan = fitz.open()
+    with fitz.open(path) as source:
+        for page in source:
+            pixmap = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+            scan_page = scan.new_page(width=page.rect.width, height=page.rect.height)
+            scan_page.insert_image(scan_page.rect, stream=pixmap.tobytes("png"))
+    scan.save(path)
+    scan.close()
+
+
+def build_docx(path, sections, table_every=DEFAULT_TABLE_EVERY, image_every=DEFAULT_IMAGE_EVERY, seed=0):
+    """
+    Write a DOCX with sections of DOCX_PARAGRAPHS_PER_UNIT paragraphs under a heading,
+    a 4x3 table every table_every sections and an image every image_every sections.
+    """
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed)
+    doc = Document()
+    for i in range(sections):
+        doc.add_heading(f"Section {i + 1}", level=2)
+        for _ in range(DOCX_PARAGRAPHS_PER_UNIT):
+            doc.add_paragraph(sentence(rng))
+        if table_every and i % table_every == 0:
+            cells = table_cells(rng, 4, 3)
+            table = doc.add_table(rows=4, cols=3)
+            for r, row in enumerate(cells):
+                for c, cell in enumerate(row):
+                    table.cell(r, c).text = cell
+        if image_every and i % image_every == 0:
+            doc.add_picture(io.BytesIO(build_image_bytes(np_rng, i)))
+    doc.save(path)
+
+
+def build_pptx(path, slides, table_every=DEFAULT_TABLE_EVERY, image_every=DEFAULT_IMAGE_EVERY, seed=0):
+    """
+    Write a PPTX with a title and body text per slide, a 4x3 table every table_every slides
+    and an image every image_every slides.
+    """
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed)
+    prs = Presentation()
+    for i in range(slides):
+        slide = prs.slides.add_slide(prs.slide_layouts[5])
+        slide.shapes.title.text = f"Slide {i + 1}"
+        body = slide.shapes.add_textbox(Inches(0.5), Inches(1.5), Inches(9), Inches(1))
+        body.text_frame.text = sentence(rng, 20)
+        if table_every and i % table_every == 0:
+            table = slide.shapes.add_table(4, 3, Inches(0.5), Inches(3), Inches(6), Inches(1.6)).table
+            for r, row in enumerate(table_cells(rng, 4, 3)):
+                for c, cell in enumerate(row):
+                    table.cell(r, c).text = cell
+        if image_every and i % image_every == 0:
+            slide.shapes.add_picture(io.BytesIO(build_image_bytes(np_rng, i)), Inches(7), Inches(3))
+    prs.save(path)
+
+
+def build_table_image(path, rows, cols=3, seed=0):
+    """
+    Write a PNG of a heading line above a ruled rows x cols table, like a scanned form.
+    """
+    rng = random.Random(seed)
+    cell_w, cell_h, x0, y0 = 220, 44, 40, 90
+    img = np.full((y0 + rows * cell_h + 40, x0 * 2 + cols * cell_w, 3), 255, dtype=np.uint8)
+    cv2.putText(img, "Statement of account", (x0, 50), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 0), 2, cv2.LINE_AA)
+    for r in range(rows + 1):
+        cv2.line(img, (x0, y0 + r * cell_h), (x0 + cols * cell_w, y0 + r * cell_h), (0, 0, 0), 2)
+    for c in range(cols + 1):
+        cv2.line(img, (x0 + c * cell_w, y0), (x0 + c * cell_w, y0 + rows * cell_h), (0, 0, 0), 2)
+    for r, row in enumerate(table_cells(rng, rows, cols)):
+        for c, cell in enumerate(row):
+            cv2.putText(img, cell.upper(), (x0 + 10 + c * cell_w, y0 + 30 + r * cell_h),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 0), 1, cv2.LINE_AA)
+    cv2.imwrite(path, img)
+
+
+# Document kind -> (file extension, builder)
+BUILDERS = {
+    "pdf": ("pdf", build_pdf),
+    "scan": ("pdf", build_scanned_pdf),
+    "docx": ("docx", build_docx),
+    "pptx": ("pptx", build_pptx),
+    "image": ("png", None),
+}
+
+
+def corpus_path(out_dir, kind, size, table_every, image_every, seed):
+    """
+    File name carrying every generator setting, so a cached document is only reused for the same settings.
+    """
+    return os.path.join(out_dir, f"{kind}_{size}_t{table_every}_i{image_every}_s{seed}.{BUILDERS[kind][0]}")
+
+
+def build_corpus(out_dir, sizes=DEFAULT_SIZES, table_every=DEFAULT_TABLE_EVERY, image_every=DEFAULT_IMAGE_EVERY,
+                 kinds=None, seed=0):
+    """
+    Build one document per kind and size in out_dir, skipping files that already exist.
+    Returns {(kind, size): path}.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {}
+    for kind in kinds or list(BUILDERS):
+        for size in sizes:
+            path = corpus_path(out_dir, kind, size, table_every, image_every, seed)
+            if not os.path.exists(path):
+                if kind == "image":
+                    build_table_image(path, size, seed=seed)
+                else:
+                    BUILDERS[kind][1](path, size, table_every, image_every, seed=seed)
+            paths[(kind, size)] = path
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the synthetic benchmark corpus")
+    parser.add_argument("out_dir", help="directory to write the documents to")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="PDF pages / DOCX sections / PPTX slides / image table rows per document")
+    parser.add_argument("--table-every", type=int, default=DEFAULT_TABLE_EVERY, help="one table per this many units")
+    parser.add_argument("--image-every", type=int, default=DEFAULT_IMAGE_EVERY, help="one image per this many units")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    paths = build_corpus(args.out_dir, args.sizes, args.table_every, args.image_every, seed=args.seed)
+    for (kind, size), path in paths.items():
+        print(f"{kind:>6} {size:>6}  {path}  ({os.path.getsize(path) / 1024:.0f} KB)")
+
+
+if __name__ == "__main__":
+    main()
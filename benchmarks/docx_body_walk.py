@@ -0,0 +1,68 @@
+"""
+Benchmark the DOCX body walk in converters/docx_converter.py.
+
+Builds documents of increasing paragraph counts with python-docx and times
+iter_docx_blocks over each. Time per paragraph should stay flat as the
+document grows.
+
+Usage:
+    python benchmarks/docx_body_walk.py
+    python benchmarks/docx_body_walk.py --sizes 100 1000 10000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from docx import Document
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from converters.docx_converter import iter_docx_blocks
+
+DEFAULT_SIZES = [100, 1000, 5000, 10000, 50000]
+
+# One 3x3 table per this many paragraphs
+TABLE_EVERY = 50
+
+
+def build_docx(path, paragraph_count):
+    """
+    Write a DOCX with paragraph_count paragraphs, a heading every 100 and a table every TABLE_EVERY.
+    """
+    doc = Document()
+    for i in range(paragraph_count):
+        if i % 100 == 0:
+            doc.add_heading(f"Section {i // 100 + 1}", level=2)
+        doc.add_paragraph(f"Paragraph {i} of the generated benchmark document.")
+        if i % TABLE_EVERY == 0:
+            table = doc.add_table(rows=3, cols=3)
+            for r in range(3):
+                for c in range(3):
+                    table.cell(r, c).text = f"r{r}c{c}"
+    doc.save(path)
+
+
+def time_body_walk(path, images_dir):
+    start = time.perf_counter()
+    blocks = sum(1 for _ in iter_docx_blocks(path, images_dir))
+    return time.perf_counter() - start, blocks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the DOCX body walk")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="paragraph counts to test")
+    args = parser.parse_args()
+
+    print(f"{'paragraphs':>10} {'blocks':>8} {'seconds':>9} {'us/paragraph':>13}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in args.sizes:
+            path = os.path.join(tmp_dir, f"bench_{size}.docx")
+            build_docx(path, size)
+            seconds, blocks = time_body_walk(path, tmp_dir)
+            print(f"{size:>10} {blocks:>8} {seconds:>9.3f} {seconds / size * 1e6:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
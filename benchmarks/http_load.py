@@ -0,0 +1,88 @@
+"""
+Load test for the HTTP conversion service (serve.py) on localhost.
+
+Sends --requests POSTs of one document from --concurrency client threads and
+reports latency percentiles, throughput and how many requests were turned
+away with 429. Start the server first, e.g. with --no-cache so repeated
+requests for the same document are really converted:
+
+Usage:
+    python serve.py --no-cache --quiet
+    python benchmarks/http_load.py report.pdf
+    python benchmarks/http_load.py report.pdf --concurrency 16 --requests 200 --stream
+"""
+import argparse
+import os
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+
+def post_document(url, data, timeout):
+    """
+    POST one document; returns (HTTP status, seconds until the whole response was read).
+    """
+    request = urllib.request.Request(url, data=data, method="POST")
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        status = e.code
+    except (urllib.error.URLError, OSError):
+        status = 0
+    return status, time.perf_counter() - start
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def run_load(url, data, concurrency, requests, timeout):
+    """
+    Send requests POSTs from concurrency threads; returns ([(status, seconds), ...], wall seconds).
+    """
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda _: post_document(url, data, timeout), range(requests)))
+    return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the HTTP conversion service")
+    parser.add_argument("document", help="document to send with every request")
+    parser.add_argument("--url", default="http://127.0.0.1:8000/convert")
+    parser.add_argument("--concurrency", type=int, default=8, help="client threads")
+    parser.add_argument("--requests", type=int, default=50, help="total requests")
+    parser.add_argument("--stream", action="store_true", help="request streamed markdown instead of a zip")
+    parser.add_argument("--timeout", type=float, default=600)
+    args = parser.parse_args()
+
+    with open(args.document, "rb") as document_file:
+        data = document_file.read()
+    query = {"name": os.path.basename(args.document)}
+    if args.stream:
+        query["stream"] = "1"
+
+    results, wall = run_load(f"{args.url}?{urlencode(query)}", data, args.concurrency, args.requests, args.timeout)
+
+    statuses = Counter(status for status, _ in results)
+    latencies = [seconds for status, seconds in results if status == 200]
+    print(f"{args.requests} requests, concurrency {args.concurrency}, {wall:.2f}s")
+    print("status: " + ", ".join(f"{status or 'error'}={count}" for status, count in sorted(statuses.items())))
+    if latencies:
+        print(f"latency p50 {percentile(latencies, 0.5):.3f}s  p90 {percentile(latencies, 0.9):.3f}s  "
+              f"p99 {percentile(latencies, 0.99):.3f}s  max {max(latencies):.3f}s")
+    print(f"throughput {len(latencies) / wall:.2f} conversions/s, {statuses.get(429, 0)} rejected with 429")
+
+
+if __name__ == "__main__":
+    main()
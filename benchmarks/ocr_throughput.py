@@ -0,0 +1,64 @@
+"""
+Benchmark OCR throughput (images per second) of the image converter.
+
+Generates small receipt-like images with OpenCV and runs ocr_words over them,
+using whichever backend converters/ocr_engine.py picks (tesserocr when
+installed, pytesseract otherwise). With --workers, images are spread over a
+process pool whose workers keep their engine loaded between images.
+
+Usage:
+    python benchmarks/ocr_throughput.py
+    python benchmarks/ocr_throughput.py --images 500 --workers 4
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from converters.image_converter import ocr_words
+from converters.ocr_engine import ocr_backend
+
+
+def build_image(index, lines=8):
+    """
+    Draw a small receipt-like grayscale image with a few lines of text.
+    """
+    img = np.full((40 + lines * 30, 420), 255, dtype=np.uint8)
+    for line in range(lines):
+        text = f"ITEM {index:04d}-{line}  QTY {line + 1}  PRICE {(index + line) % 97}.99"
+        cv2.putText(img, text, (10, 35 + line * 30), cv2.FONT_HERSHEY_SIMPLEX, 0.6, 0, 1, cv2.LINE_AA)
+    return img
+
+
+def ocr_count(gray):
+    return len(ocr_words(gray))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark OCR throughput")
+    parser.add_argument("--images", type=int, default=100, help="number of images to OCR")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes (1 runs in-process)")
+    args = parser.parse_args()
+
+    images = [build_image(i) for i in range(args.images)]
+
+    start = time.perf_counter()
+    if args.workers > 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            words = sum(executor.map(ocr_count, images, chunksize=8))
+    else:
+        words = sum(ocr_count(img) for img in images)
+    seconds = time.perf_counter() - start
+
+    print(f"backend: {ocr_backend()}  workers: {args.workers}")
+    print(f"{args.images} images, {words} words in {seconds:.2f}s -> {args.images / seconds:.1f} images/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Benchmark the OCR fallback for scanned PDFs in pages per minute.
+
+Builds a scanned PDF from the synthetic corpus (every page an image, no text
+layer) and converts it with convert_pdf_to_md once per --workers value, so the
+in-process path can be compared with the OCR process pool. Table detection is
+off so only rendering and OCR are measured.
+
+Usage:
+    python benchmarks/pdf_ocr.py
+    python benchmarks/pdf_ocr.py --pages 40 --workers 1 2 4 8 --dpi 200
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.corpus import SCAN_DPI, build_scanned_pdf
+from converters.ocr_engine import ocr_backend
+from converters.pdf_converter import OCR_DPI, convert_pdf_to_md
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark OCR of scanned PDF pages")
+    parser.add_argument("--pages", type=int, default=20, help="pages in the scanned PDF")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1],
+                        help="OCR worker counts to compare")
+    parser.add_argument("--dpi", type=int, default=OCR_DPI, help="resolution pages are rendered at for OCR")
+    parser.add_argument("--scan-dpi", type=int, default=SCAN_DPI, help="resolution of the scanned page images")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        pdf_path = os.path.join(work_dir, "scan.pdf")
+        build_scanned_pdf(pdf_path, args.pages, dpi=args.scan_dpi)
+
+        print(f"backend: {ocr_backend()}  pages: {args.pages}  render dpi: {args.dpi}")
+        for workers in args.workers:
+            start = time.perf_counter()
+            markdown = convert_pdf_to_md(pdf_path, os.path.join(work_dir, "out.md"),
+                                         os.path.join(work_dir, "images"), table_detection="off",
+                                         ocr_dpi=args.dpi, ocr_workers=workers)
+            seconds = time.perf_counter() - start
+            words = len(markdown.split()) if markdown else 0
+            print(f"workers {workers:>3}: {seconds:7.2f}s  {args.pages * 60 / seconds:7.1f} pages/min  {words} words")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+Benchmark every converter and its main stages on the synthetic corpus.
+
+Each case (a converter end to end, or one stage such as Camelot table
+extraction, the DOCX body walk or image table detection) runs in a fresh
+process for every document size. The best wall time over --repeat runs and
+the process's peak RSS are recorded.
+
+Results are compared with a stored baseline: a case fails when its time or
+peak memory grows by more than --threshold (relative) over the baseline, so
+this can gate changes in CI. Baselines are machine specific; record one with
+--save-baseline on the machine that runs the comparison.
+
+Usage:
+    python benchmarks/run_benchmarks.py --save-baseline
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --cases pdf.convert docx.body_walk --sizes 10 50 --threshold 0.1
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.corpus import DEFAULT_IMAGE_EVERY, DEFAULT_TABLE_EVERY, build_corpus
+
+DEFAULT_SIZES = [10, 50]
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_THRESHOLD = 0.2
+
+# Differences below these are noise, whatever the relative change
+MIN_TIME_DELTA = 0.05
+MIN_MEMORY_DELTA_MB = 10
+
+
+def require(result):
+    """
+    Fail the case if the converter reported an error (it returns None) instead of timing it as a fast run.
+    """
+    if result is None:
+        raise RuntimeError("Converter returned no result")
+    return result
+
+
+def require_ocr_text(markdown):
+    """
+    Fail the case if scanned pages came out as image links only, i.e. OCR failed and the converter fell back.
+    """
+    if not any(line.strip() and not line.startswith("![") for line in require(markdown).splitlines()):
+        raise RuntimeError("OCR produced no text")
+
+
+def case_pdf_convert(path, work_dir):
+    from converters.pdf_converter import convert_pdf_to_md
+    require(convert_pdf_to_md(path, os.path.join(work_dir, "out.md"), os.path.join(work_dir, "images")))
+
+
+def case_pdf_text(path, work_dir):
+    from converters.pdf_converter import convert_pdf_to_md
+    require(convert_pdf_to_md(path, os.path.join(work_dir, "out.md"), os.path.join(work_dir, "images"),
+                              table_detection="off"))
+
+
+def case_pdf_tables(path, work_dir):
+    import fitz
+    from converters.pdf_converter import extract_tables_by_page, select_table_pages
+    with fitz.open(path) as pdf:
+        table_pages = select_table_pages(pdf, range(1, pdf.page_count + 1))
+    extract_tables_by_page(path, table_pages)
+
+
+def case_pdf_ocr(path, work_dir):
+    from converters.pdf_converter import convert_pdf_to_md
+    require_ocr_text(convert_pdf_to_md(path, os.path.join(work_dir, "out.md"), os.path.join(work_dir, "images"),
+                                       table_detection="off"))
+
+
+def case_pdf_ocr_pool(path, work_dir):
+    from converters.pdf_converter import convert_pdf_to_md
+    require_ocr_text(convert_pdf_to_md(path, os.path.join(work_dir, "out.md"), os.path.join(work_dir, "images"),
+                                       table_detection="off", ocr_workers=None))
+
+
+def case_docx_convert(path, work_dir):
+    from converters.docx_converter import convert_docx_to_md
+    require(convert_docx_to_md(path, os.path.join(work_dir, "out.md"), os.path.join(work_dir, "images")))
+
+
+def case_docx_body_walk(path, work_dir):
+    from converters.docx_converter import iter_docx_blocks
+    for _ in iter_docx_blocks(path, os.path.join(work_dir, "images")):
+        pass
+
+
+def case_docx_stream(path, work_dir):
+    from converters.docx_converter import iter_docx_blocks_streaming
+    for _ in iter_docx_blocks_streaming(path, os.path.join(work_dir, "images")):
+        pass
+
+
+def case_pptx_convert(path, work_dir):
+    from converters.pptx_converter import convert_pptx_to_md
+    require(convert_pptx_to_md(path, os.path.join(work_dir, "out.md"), os.path.join(work_dir, "images")))
+
+
+def case_image_convert(path, work_dir):
+    from converters.image_converter import convert_image_to_md
+    require(convert_image_to_md(path, work_dir))
+
+
+def case_image_table_regions(path, work_dir):
+    import cv2
+    from converters.image_converter import detect_table_regions
+    detect_table_regions(cv2.imread(path))
+
+
+def case_image_table_extract(path, work_dir):
+    import cv2
+    from converters.image_converter import extract_table_from_image
+    extract_table_from_image(cv2.imread(path))
+
+
+# Case name -> (corpus document kind, function run on the document)
+CASES = {
+    "pdf.convert": ("pdf", case_pdf_convert),
+    "pdf.text": ("pdf", case_pdf_text),
+    "pdf.tables": ("pdf", case_pdf_tables),
+    "pdf.ocr": ("scan", case_pdf_ocr),
+    "pdf.ocr_pool": ("scan", case_pdf_ocr_pool),
+    "docx.convert": ("docx", case_docx_convert),
+    "docx.body_walk": ("docx", case_docx_body_walk),
+    "docx.stream": ("docx", case_docx_stream),
+    "pptx.convert": ("pptx", case_pptx_convert),
+    "image.convert": ("image", case_image_convert),
+    "image.table_regions": ("image", case_image_table_regions),
+    "image.table_extract": ("image", case_image_table_extract),
+}
+
+
+def run_case(case, path, repeat):
+    """
+    Run one case in the current (fresh) process.
+    Returns the best wall time over repeat runs and the process's peak RSS in MB.
+    """
+    import resource
+    from contextlib import redirect_stdout
+
+    function = CASES[case][1]
+    best = None
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as work_dir, open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            start = time.perf_counter()
+            function(path, work_dir)
+            seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+
+    # ru_maxrss is in kilobytes on Linux
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return {"seconds": round(best, 4), "peak_rss_mb": round(peak_rss_mb, 1)}
+
+
+def run_benchmarks(corpus_dir, cases, sizes, repeat=3, table_every=DEFAULT_TABLE_EVERY,
+                   image_every=DEFAULT_IMAGE_EVERY):
+    """
+    Run each case on each corpus size, every one in its own process so peak memory is per case.
+    Returns {"<case>@<size>": {"seconds": ..., "peak_rss_mb": ...}}.
+    """
+    kinds = sorted({CASES[case][0] for case in cases})
+    paths = build_corpus(corpus_dir, sizes, table_every, image_every, kinds=kinds)
+
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    for case in cases:
+        for size in sizes:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                result = executor.submit(run_case, case, paths[(CASES[case][0], size)], repeat).result()
+            results[f"{case}@{size}"] = result
+            print(f"{case:>20} {size:>6} {result['seconds']:>9.3f}s {result['peak_rss_mb']:>8.1f} MB")
+    return results
+
+
+def compare_with_baseline(results, baseline, threshold):
+    """
+    Return a list of regression messages for results slower or larger than baseline by more than threshold.
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+
+        delta = result["seconds"] - base["seconds"]
+        if delta > MIN_TIME_DELTA and result["seconds"] > base["seconds"] * (1 + threshold):
+            regressions.append(f"{name}: {base['seconds']:.3f}s -> {result['seconds']:.3f}s")
+
+        delta = result["peak_rss_mb"] - base["peak_rss_mb"]
+        if delta > MIN_MEMORY_DELTA_MB and result["peak_rss_mb"] > base["peak_rss_mb"] * (1 + threshold):
+            regressions.append(f"{name}: {base['peak_rss_mb']:.1f} MB -> {result['peak_rss_mb']:.1f} MB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the converters and compare with a baseline")
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES), help="cases to run")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="corpus sizes to run")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case; the best time is kept")
+    parser.add_argument("--corpus-dir", default=os.path.join(tempfile.gettempdir(), "md_converter_corpus"),
+                        help="where the generated documents are kept between runs")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed relative slowdown or memory growth (0.2 = 20%%)")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    print(f"{'case':>20} {'size':>6} {'time':>10} {'peak RSS':>11}")
+    results = run_benchmarks(args.corpus_dir, args.cases, args.sizes, args.repeat)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as json_file:
+            json.dump(results, json_file, indent=2)
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, "r", encoding="utf-8") as baseline_file:
+                baseline = json.load(baseline_file)
+        baseline.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as baseline_file:
+            json.dump(baseline, baseline_file, indent=2, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline first")
+        return 0
+
+    with open(args.baseline, "r", encoding="utf-8") as baseline_file:
+        regressions = compare_with_baseline(results, json.load(baseline_file), args.threshold)
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
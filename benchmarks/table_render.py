@@ -0,0 +1,72 @@
+"""
+Benchmark the native markdown table renderer against pandas' DataFrame.to_markdown.
+
+Times converters.utils.format_table_as_markdown on generated tables and, when
+pandas and tabulate are installed, DataFrame.to_markdown on the same data.
+
+Usage:
+    python benchmarks/table_render.py
+    python benchmarks/table_render.py --rows 10000 100000 --cols 12
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from converters.utils import format_table_as_markdown
+
+DEFAULT_ROWS = [10000, 50000, 100000]
+
+
+def build_table(rows, cols):
+    """
+    Header row plus rows x cols cells, some holding pipes and line breaks.
+    """
+    table = [[f"Column {c}" for c in range(cols)]]
+    for r in range(rows):
+        row = [f"r{r}c{c}" for c in range(cols)]
+        if r % 10 == 0:
+            row[0] = f"multi\nline {r}"
+        if r % 15 == 0:
+            row[-1] = f"a|b {r}"
+        table.append(row)
+    return table
+
+
+def time_call(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark markdown table rendering")
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS, help="table row counts")
+    parser.add_argument("--cols", type=int, default=8, help="table column count")
+    args = parser.parse_args()
+
+    try:
+        import pandas as pd
+        import tabulate  # noqa: F401  (to_markdown needs it)
+    except ImportError:
+        pd = None
+        print("pandas/tabulate not installed, timing the native renderer only")
+
+    print(f"{'rows':>8} {'native s':>9} {'pandas s':>9} {'speedup':>8}")
+    for rows in args.rows:
+        table = build_table(rows, args.cols)
+        native = time_call(lambda: format_table_as_markdown(table))
+
+        if pd is None:
+            print(f"{rows:>8} {native:>9.3f} {'-':>9} {'-':>8}")
+            continue
+
+        df = pd.DataFrame(table[1:], columns=table[0])
+        pandas_time = time_call(lambda: df.to_markdown(index=False))
+        print(f"{rows:>8} {native:>9.3f} {pandas_time:>9.3f} {pandas_time / native:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Lazy registry of the file converters.
+
+Each converter module pulls in heavy backends (PyMuPDF and Camelot, OpenCV and
+Tesseract, python-docx, python-pptx), so nothing is imported here until a
+format is actually requested.
+"""
+import importlib
+import importlib.util
+import os
+
+# Either OCR backend will do: tesserocr is preferred, pytesseract is the fallback (see ocr_engine.py)
+OCR_BACKENDS = ("tesserocr", "pytesseract")
+
+# File extension -> (module, function, backend modules it needs); a tuple entry means any one of those modules
+CONVERTERS = {
+    "pdf": ("converters.pdf_converter", "convert_pdf_to_md", ("fitz", "camelot")),
+    "docx": ("converters.docx_converter", "convert_docx_to_md", ("docx",)),
+    "ppt": ("converters.pptx_converter", "convert_pptx_to_md", ("pptx",)),
+    "pptx": ("converters.pptx_converter", "convert_pptx_to_md", ("pptx",)),
+    "png": ("converters.image_converter", "convert_image_to_md", ("cv2", OCR_BACKENDS)),
+    "jpg": ("converters.image_converter", "convert_image_to_md", ("cv2", OCR_BACKENDS)),
+    "jpeg": ("converters.image_converter", "convert_image_to_md", ("cv2", OCR_BACKENDS)),
+}
+
+# File extension -> backend modules that are only needed for part of the conversion
+# (OCR of PDF pages without a text layer); without them the rest still converts
+OPTIONAL_BACKENDS = {
+    "pdf": ("cv2", OCR_BACKENDS),
+}
+
+# Converter module -> (generator yielding markdown per page, slide or block, separator that joins its output)
+PAGE_ITERATORS = {
+    "converters.pdf_converter": ("iter_pdf_to_md", "\n\n"),
+    "converters.docx_converter": ("iter_docx_to_md", "\n\n"),
+    "converters.pptx_converter": ("iter_pptx_to_md", "\n"),
+}
+
+# Converter module -> keyword argument of its convert/iter functions that selects pages or slides
+PAGE_SELECTORS = {
+    "converters.pdf_converter": "pages",
+    "converters.pptx_converter": "slides",
+}
+
+# Bump a converter's version whenever its markdown output changes; it is part of the result cache key
+CONVERTER_VERSIONS = {
+    "converters.pdf_converter": 2,
+    "converters.docx_converter": 2,
+    "converters.pptx_converter": 1,
+    "converters.image_converter": 3,
+}
+
+
+def supported_formats():
+    """
+    File extensions with a registered converter.
+    """
+    return list(CONVERTERS)
+
+
+def get_converter(file_ext):
+    """
+    Return the convert_*_to_md function for a file extension, importing its module on first use.
+    Returns None if the extension is unknown or its backends cannot be imported.
+    """
+    entry = CONVERTERS.get(file_ext.lower().lstrip("."))
+    if entry is None:
+        return None
+
+    module_name, function_name, _ = entry
+    try:
+        module = importlib.import_module(module_name)
+    except ImportError:
+        return None
+    return getattr(module, function_name)
+
+
+def get_page_iterator(file_ext):
+    """
+    Return (iter_*_to_md function, separator) for formats converted page by page, importing on first use.
+    Returns None for formats converted in one step (images) or whose backends cannot be imported.
+    """
+    entry = CONVERTERS.get(file_ext.lower().lstrip("."))
+    if entry is None or entry[0] not in PAGE_ITERATORS:
+        return None
+
+    function_name, separator = PAGE_ITERATORS[entry[0]]
+    try:
+        module = importlib.import_module(entry[0])
+    except ImportError:
+        return None
+    return getattr(module, function_name), separator
+
+
+def page_selector(file_ext):
+    """
+    Name of the keyword argument selecting pages ("pages") or slides ("slides") for a format,
+    or None if its converter always converts the whole file.
+    """
+    entry = CONVERTERS.get(file_ext.lower().lstrip("."))
+    if entry is None:
+        return None
+    return PAGE_SELECTORS.get(entry[0])
+
+
+def markdown_chunks(source, file_ext, images_dir, name=None, pages=None, output_md_path=None):
+    """
+    Convert source (a path, bytes or binary file object) with the converter for file_ext.
+    Returns (chunks, separator): an iterator over the markdown one page, slide or block at a time
+    (a single chunk for images) and the string that joins the chunks into the document.
+    Images are written to images_dir and linked as images/<file>; pages selects PDF pages or PPTX slides.
+    Raises RuntimeError if no converter is available.
+    """
+    file_ext = file_ext.lower().lstrip(".")
+    page_iterator = get_page_iterator(file_ext)
+    if page_iterator is None:
+        convert = get_converter(file_ext)
+        if convert is None:
+            raise RuntimeError(f"No converter available for .{file_ext}")
+        return _convert_whole(convert, source, images_dir, name), "\n\n"
+
+    iter_to_md, separator = page_iterator
+    kwargs = {"output_md_path": output_md_path, "images_output_dir": images_dir}
+    if file_ext not in ("ppt", "pptx"):
+        kwargs["name"] = name
+    if pages is not None and page_selector(file_ext):
+        kwargs[page_selector(file_ext)] = pages
+    return iter_to_md(source, **kwargs), separator
+
+
+def _convert_whole(convert, source, images_dir, name):
+    # The image converter writes <output_dir>/<name>.md and its images to <output_dir>/images
+    md_path = convert(source, output_dir=os.path.dirname(images_dir) or ".", name=name)
+    if md_path is None:
+        raise RuntimeError("Converter reported an error")
+    with open(md_path, "r", encoding="utf-8") as md_file:
+        yield md_file.read()
+
+
+def _backend_installed(backend):
+    """
+    Whether a backend module, or any one of a tuple of alternatives, is installed.
+    """
+    if isinstance(backend, tuple):
+        return any(_backend_installed(alternative) for alternative in backend)
+    return importlib.util.find_spec(backend) is not None
+
+
+def available_backends():
+    """
+    Map each extension to whether all of its backend modules are installed.
+    Uses importlib.util.find_spec, so nothing is imported.
+    """
+    status = {}
+    for file_ext, (_, _, backends) in CONVERTERS.items():
+        status[file_ext] = all(_backend_installed(backend) for backend in backends)
+    return status
+
+
+def available_optional_backends():
+    """
+    Map each extension with optional backends to whether all of them are installed, like available_backends.
+    """
+    status = {}
+    for file_ext, backends in OPTIONAL_BACKENDS.items():
+        status[file_ext] = all(_backend_installed(backend) for backend in backends)
+    return status
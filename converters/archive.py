@@ -0,0 +1,212 @@
+"""
+Single-archive output: a document's markdown and every image it links to in one zip or tar file.
+
+The markdown keeps its relative links (images/<file>), and images are stored
+under images/ inside the archive, so the links stay valid once it is unpacked.
+An archive on disk is written under a temporary name and renamed into place
+when complete, so the destination only ever receives one finished file, which
+suits network storage far better than many small image files. Without a path,
+the archive is built in memory (e.g. for a download button or an HTTP reply).
+"""
+import io
+import os
+import shutil
+import tarfile
+import tempfile
+import time
+import uuid
+import zipfile
+
+from converters import markdown_chunks
+from converters.cache import linked_images
+from converters.utils import source_base_name
+
+ARCHIVE_FORMATS = ("zip", "tar", "tar.gz")
+
+# Archive file suffix for each format
+ARCHIVE_SUFFIXES = {"zip": ".zip", "tar": ".tar", "tar.gz": ".tar.gz"}
+
+# Markdown bigger than this is spooled to a temporary file before going into a tar (tar needs sizes up front)
+TAR_SPOOL_BYTES = 16 * 1024 * 1024
+
+
+def archive_format(path):
+    """
+    Archive format implied by a file name's suffix; zip if it has none of the known ones.
+    """
+    path = str(path).lower()
+    if path.endswith((".tar.gz", ".tgz")):
+        return "tar.gz"
+    if path.endswith(".tar"):
+        return "tar"
+    return "zip"
+
+
+class MarkdownArchive:
+    """
+    Sink for one markdown file and its images, written into a zip or tar archive.
+    - path: where to write the archive, or None to build it in memory (see getvalue())
+    - fmt: "zip", "tar" or "tar.gz" (default: from the path's suffix, else zip)
+    Use it as a context manager: the archive only appears at path once the block exits
+    without an error; otherwise the partial file is removed.
+    """
+
+    def __init__(self, path=None, fmt=None):
+        self.fmt = fmt or (archive_format(path) if path else "zip")
+        if self.fmt not in ARCHIVE_FORMATS:
+            raise ValueError(f"Unknown archive format: {self.fmt}")
+        self.path = None if path is None else str(path)
+        self._names = set()
+
+        if self.path is None:
+            self._tmp_path = None
+            self._file = io.BytesIO()
+        else:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._tmp_path = f"{self.path}.{uuid.uuid4().hex}.tmp"
+            self._file = open(self._tmp_path, "wb")
+
+        if self.fmt == "zip":
+            self._archive = zipfile.ZipFile(self._file, "w", zipfile.ZIP_DEFLATED)
+        else:
+            self._archive = tarfile.open(fileobj=self._file, mode="w:gz" if self.fmt == "tar.gz" else "w")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write_markdown(self, name, chunks, separator="\n\n"):
+        """
+        Stream markdown chunks into the archive as name, joined with separator.
+        Returns the number of characters written.
+        """
+        written = 0
+        if self.fmt == "zip":
+            with self._archive.open(name, "w") as entry:
+                for index, chunk in enumerate(chunks):
+                    data = ((separator if index else "") + chunk).encode("utf-8")
+                    entry.write(data)
+                    written += len(chunk)
+        else:
+            with tempfile.SpooledTemporaryFile(max_size=TAR_SPOOL_BYTES) as spool:
+                for index, chunk in enumerate(chunks):
+                    spool.write(((separator if index else "") + chunk).encode("utf-8"))
+                    written += len(chunk)
+                info = tarfile.TarInfo(name)
+                info.size = spool.tell()
+                info.mtime = int(time.time())
+                spool.seek(0)
+                self._archive.addfile(info, spool)
+        self._names.add(name)
+        return written
+
+    def add_image(self, filename, image_path):
+        """
+        Add an image file as images/<filename>, once per archive.
+        """
+        arcname = f"images/{filename}"
+        if arcname in self._names:
+            return
+        if self.fmt == "zip":
+            # Images are already compressed formats
+            self._archive.write(image_path, arcname, compress_type=zipfile.ZIP_STORED)
+        else:
+            self._archive.add(image_path, arcname, recursive=False)
+        self._names.add(arcname)
+
+    def add_images_dir(self, images_dir):
+        """
+        Add every image in images_dir, e.g. a staging folder used by a single conversion.
+        """
+        if os.path.isdir(images_dir):
+            for filename in sorted(os.listdir(images_dir)):
+                self.add_image(filename, os.path.join(images_dir, filename))
+
+    def add_linked_images(self, markdown, images_dir):
+        """
+        Add every image the markdown links to that exists in images_dir; returns how many were found.
+        """
+        added = 0
+        for filename in linked_images(markdown):
+            image_path = os.path.join(images_dir, filename)
+            if os.path.exists(image_path):
+                self.add_image(filename, image_path)
+                added += 1
+        return added
+
+    def close(self):
+        """
+        Finish the archive and, when writing to disk, move it into place.
+        """
+        self._archive.close()
+        if self._tmp_path is not None:
+            self._file.close()
+            os.replace(self._tmp_path, self.path)
+            self._tmp_path = None
+
+    def abort(self):
+        """
+        Drop a partially written archive.
+        """
+        try:
+            self._archive.close()
+        finally:
+            if self._tmp_path is not None:
+                self._file.close()
+                os.remove(self._tmp_path)
+                self._tmp_path = None
+
+    def getvalue(self):
+        """
+        The archive's bytes, for an archive built in memory.
+        """
+        return self._file.getvalue()
+
+
+def build_archive(markdown, md_name, images_dir, fmt="zip"):
+    """
+    Pack markdown (as md_name) with the images it links to from images_dir into an archive in memory.
+    Returns the archive's bytes.
+    """
+    with MarkdownArchive(fmt=fmt) as archive:
+        archive.write_markdown(md_name, [markdown])
+        archive.add_linked_images(markdown, images_dir)
+    return archive.getvalue()
+
+
+def convert_to_archive(source, archive_path=None, file_ext=None, name=None, fmt=None, pages=None):
+    """
+    Convert a document straight into one archive holding <name>.md and images/.
+    source may be a path, bytes or a binary file object (name sets the file names and,
+    without file_ext, the format). Pages are streamed into the archive as they are converted;
+    images are staged in a local temporary directory, so archive_path only ever receives one file.
+    pages selects PDF pages or PPTX slides.
+    Returns archive_path, or the archive's bytes if archive_path is None; prints the error and returns None on failure.
+    """
+    try:
+        if file_ext is None:
+            file_ext = os.path.splitext(str(name if name is not None else source))[1]
+        file_ext = file_ext.lower().lstrip(".")
+        md_name = f"{source_base_name(source, name)}.md"
+
+        staging_dir = tempfile.mkdtemp(prefix="md-archive-")
+        try:
+            images_dir = os.path.join(staging_dir, "images")
+            chunks, separator = markdown_chunks(source, file_ext, images_dir, name, pages,
+                                                output_md_path=os.path.join(staging_dir, md_name))
+            with MarkdownArchive(archive_path, fmt) as archive:
+                archive.write_markdown(md_name, chunks, separator)
+                # Every image in the staging folder came from this document
+                archive.add_images_dir(images_dir)
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+        return archive.getvalue() if archive_path is None else archive_path
+    except Exception as e:
+        print(f"Error writing archive: {e}")
+        return None
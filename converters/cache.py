@@ -0,0 +1,183 @@
+"""
+On-disk cache of conversion results, keyed by the content of the input.
+
+An entry holds the markdown of one conversion and the images it links to. The key
+is the SHA-256 of the input bytes together with the converter, its version (see
+CONVERTER_VERSIONS) and the conversion options, so re-uploading the same document
+skips the converter entirely. Entries are evicted least recently used first once
+the cache grows past its size limit.
+
+Entries are written to a temporary directory and renamed into place, so the
+Streamlit app and several batch workers can share one cache directory.
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+
+from converters import CONVERTER_VERSIONS, CONVERTERS
+from converters.utils import IMAGE_HASH_LENGTH, write_file_atomic
+
+DEFAULT_CACHE_DIR = os.path.join("output", "cache")
+DEFAULT_CACHE_MB = 1024
+
+# Bump when the entry layout changes; old entries then simply stop matching
+CACHE_FORMAT = 1
+
+MARKDOWN_NAME = "result.md"
+META_NAME = "meta.json"
+
+# Links written by ImageStore: images/<sha256 prefix>.<ext>
+IMAGE_LINK_RE = re.compile(r"\]\(images/([0-9a-f]{%d}\.[A-Za-z0-9]+)\)" % IMAGE_HASH_LENGTH)
+
+
+def hash_source(source):
+    """
+    SHA-256 hex digest of a converter input given as bytes or a path.
+    Paths are hashed in chunks so large files are never held in memory.
+    """
+    digest = hashlib.sha256()
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        digest.update(source)
+    else:
+        with open(source, "rb") as src:
+            for chunk in iter(lambda: src.read(1024 * 1024), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def linked_images(markdown):
+    """
+    File names of the stored images a markdown document links to, in order of first use.
+    """
+    return list(dict.fromkeys(IMAGE_LINK_RE.findall(markdown)))
+
+
+class ResultCache:
+    """
+    Size-bounded LRU cache of markdown plus images in cache_dir.
+    An entry's modification time is its last use; a hit touches it.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_mb=DEFAULT_CACHE_MB):
+        self.cache_dir = str(cache_dir)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def key(self, source, file_ext, options=None):
+        """
+        Cache key for converting source (bytes or a path) as file_ext with the given options.
+        """
+        module_name = CONVERTERS[file_ext.lower().lstrip(".")][0]
+        fingerprint = {
+            "format": CACHE_FORMAT,
+            "input": hash_source(source),
+            "converter": module_name,
+            "version": CONVERTER_VERSIONS[module_name],
+            "options": options or {},
+        }
+        return hashlib.sha256(json.dumps(fingerprint, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def get(self, key, images_dir=None):
+        """
+        Return the cached markdown for key, or None on a miss.
+        If images_dir is given, the entry's images are copied there unless already present.
+        """
+        entry_dir = self._entry_dir(key)
+        try:
+            with open(os.path.join(entry_dir, MARKDOWN_NAME), "r", encoding="utf-8") as md_file:
+                markdown = md_file.read()
+
+            if images_dir is not None:
+                os.makedirs(images_dir, exist_ok=True)
+                for filename in linked_images(markdown):
+                    target = os.path.join(images_dir, filename)
+                    if not os.path.exists(target):
+                        shutil.copyfile(os.path.join(entry_dir, "images", filename), target)
+
+            os.utime(entry_dir)
+        except OSError:
+            # Missing, half-evicted or unreadable entries count as a miss
+            return None
+        return markdown
+
+    def put(self, key, markdown, images_dir=None):
+        """
+        Store markdown and the images it links to (read from images_dir) under key,
+        then evict least recently used entries until the cache fits its size limit.
+        """
+        entry_dir = self._entry_dir(key)
+        tmp_dir = os.path.join(self.cache_dir, f"{uuid.uuid4().hex}.tmp")
+        size = 0
+        try:
+            os.makedirs(os.path.join(tmp_dir, "images"))
+            data = markdown.encode("utf-8")
+            write_file_atomic(os.path.join(tmp_dir, MARKDOWN_NAME), data)
+            size += len(data)
+
+            if images_dir is not None:
+                for filename in linked_images(markdown):
+                    source = os.path.join(images_dir, filename)
+                    if os.path.exists(source):
+                        shutil.copyfile(source, os.path.join(tmp_dir, "images", filename))
+                        size += os.path.getsize(source)
+
+            with open(os.path.join(tmp_dir, META_NAME), "w", encoding="utf-8") as meta_file:
+                json.dump({"size": size, "created": time.time()}, meta_file)
+
+            os.makedirs(os.path.dirname(entry_dir), exist_ok=True)
+            try:
+                os.rename(tmp_dir, entry_dir)
+            except OSError:
+                # Another process stored the same result first
+                pass
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        self.evict()
+
+    def entries(self):
+        """
+        List (last_used, size, entry_dir) for every complete entry.
+        """
+        found = []
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir() or len(shard.name) != 2:
+                continue
+            for entry in os.scandir(shard.path):
+                try:
+                    with open(os.path.join(entry.path, META_NAME), "r", encoding="utf-8") as meta_file:
+                        size = json.load(meta_file)["size"]
+                    found.append((entry.stat().st_mtime, size, entry.path))
+                except (OSError, ValueError, KeyError):
+                    continue
+        return found
+
+    def evict(self):
+        """
+        Delete least recently used entries until the total size is within max_bytes.
+        Returns the number of entries removed.
+        """
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, entry_dir in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self):
+        """
+        Remove every entry.
+        """
+        for _, _, entry_dir in self.entries():
+            shutil.rmtree(entry_dir, ignore_errors=True)
@@ -175,66 +175,70 @@
 
 
 import os
-import pandas as pd
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
 from docx import Document
+from docx.table import Table
+from docx.text.paragraph import Paragraph
+from converters.profiling import span_iter
+from converters.utils import ImageStore, format_table_as_markdown, open_source, source_base_name, stream_markdown
 
+# Engines accepted by convert_docx_to_md
+DOCX_ENGINES = ("python-docx", "stream")
 
-def convert_docx_to_md(docx_path, output_md_path=None, images_output_dir=None):
-    """
-    Convert DOCX to Markdown, preserving the original sequence of text, tables, and images.
-    """
-    try:
-        base_name = os.path.splitext(os.path.basename(docx_path))[0]
-        if images_output_dir is None:
-            images_output_dir = os.path.join("output", "images")
-        if output_md_path is None:
-            output_md_path = os.path.join("output", f"{base_name}.md")
-
-        os.makedirs(os.path.dirname(output_md_path), exist_ok=True)
-        os.makedirs(images_output_dir, exist_ok=True)
+# Namespaces used by the streaming engine
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+R_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+A_NS = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+V_NS = "{urn:schemas-microsoft-com:vml}"
+PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+OFFICE_DOCUMENT_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
 
-        doc = Document(docx_path)
-        md_content = []
 
-        rels = doc.part.rels
-        image_counter = 1
+def heading_to_markdown(text, style):
+    """
+    Map a paragraph's lower-cased style name to a markdown heading.
+    """
+    if "heading 1" in style:
+        return f"# {text}"
+    elif "heading 2" in style:
+        return f"## {text}"
+    elif "heading 3" in style:
+        return f"### {text}"
+    return text
 
-        # Helper: Save image and return markdown link
-        def save_image(rel):
-            nonlocal image_counter
-            image_data = rel.target_part.blob
-            image_ext = rel.target_ref.split(".")[-1]
-            image_filename = f"{base_name}_img{image_counter}.{image_ext}"
-            image_path = os.path.join(images_output_dir, image_filename)
 
-            with open(image_path, "wb") as img_file:
-                img_file.write(image_data)
+def iter_docx_blocks(docx_path, images_output_dir):
+    """
+    Yield the markdown of each top-level body block (paragraph or table) in document order,
+    followed by the extracted images.
+    """
+    doc = Document(open_source(docx_path))
 
-            image_counter += 1
-            return f"![Image](images/{image_filename})"
+    rels = doc.part.rels
+    style_names = {}
 
-        # Iterate through elements in original order
+    with ImageStore(images_output_dir) as image_store:
+        # Iterate through elements in original order, wrapping each one directly
+        # (looking it up in doc.paragraphs / doc.tables rescans the whole body)
         for block in doc.element.body:
             tag = block.tag.split("}")[-1]
 
             if tag == "p":  # Paragraph
-                paragraph = next(p for p in doc.paragraphs if p._p == block)
+                paragraph = Paragraph(block, doc._body)
                 text = paragraph.text.strip()
                 if not text:
                     continue
 
-                style = paragraph.style.name.lower()
-                if "heading 1" in style:
-                    md_content.append(f"# {text}")
-                elif "heading 2" in style:
-                    md_content.append(f"## {text}")
-                elif "heading 3" in style:
-                    md_content.append(f"### {text}")
-                else:
-                    md_content.append(text)
+                # Resolving a style walks the styles part, so do it once per style id
+                style_id = block.style
+                if style_id not in style_names:
+                    style_names[style_id] = paragraph.style.name.lower()
+                yield heading_to_markdown(text, style_names[style_id])
 
             elif tag == "tbl":  # Table
-                table = next(t for t in doc.tables if t._tbl == block)
+                table = Table(block, doc._body)
                 table_data = []
                 for row in table.rows:
                     row_data = []
@@ -243,25 +247,226 @@ def convert_docx_to_md(docx_path, output_md_path=None, images_output_dir=None):
                         row_data.append(cell_text if cell_text else " ")
                     table_data.append(row_data)
 
-                try:
-                    df = pd.DataFrame(table_data)
-                    md_table = df.to_markdown(index=False, headers=None)
-                except Exception:
-                    md_table = "\n".join(["| " + " | ".join(r) + " |" for r in table_data])
-
-                md_content.append(md_table)
+                yield format_table_as_markdown(table_data, header=False)
 
         # Insert inline images where they appear in rels order
-        for rel in rels.values():
+        for r_id, rel in rels.items():
             if "image" in rel.target_ref:
-                md_content.append(save_image(rel))
+                yield image_store.add(rel.target_part.blob, rel.target_ref.split(".")[-1], key=r_id)
+
 
-        # Save to file
-        with open(output_md_path, "w", encoding="utf-8") as f:
-            f.write("\n\n".join(md_content))
+def _read_rels(archive, part_name):
+    """
+    Return {rId: (target part name or URL, is_external)} for a part of the package.
+    """
+    part_dir, part_file = posixpath.split(part_name)
+    rels_name = posixpath.join(part_dir, "_rels", f"{part_file}.rels")
+    rels = {}
+    if rels_name not in archive.namelist():
+        return rels
+
+    with archive.open(rels_name) as rels_file:
+        for rel in ET.parse(rels_file).getroot().iter(f"{PKG_REL_NS}Relationship"):
+            target = rel.get("Target")
+            is_external = rel.get("TargetMode") == "External"
+            if not is_external:
+                if target.startswith("/"):
+                    target = target.lstrip("/")
+                else:
+                    target = posixpath.normpath(posixpath.join(part_dir, target))
+            rels[rel.get("Id")] = (target, is_external, rel.get("Type"))
+    return rels
+
+
+def _read_style_names(archive, styles_part):
+    """
+    Return ({styleId: lower-cased name}, default paragraph style name) from the styles part.
+    """
+    style_names = {}
+    default_style = "normal"
+    if styles_part is None or styles_part not in archive.namelist():
+        return style_names, default_style
+
+    with archive.open(styles_part) as styles_file:
+        for style in ET.parse(styles_file).getroot().iter(f"{W_NS}style"):
+            name_elem = style.find(f"{W_NS}name")
+            name = (name_elem.get(f"{W_NS}val") if name_elem is not None else style.get(f"{W_NS}styleId")) or ""
+            style_names[style.get(f"{W_NS}styleId")] = name.lower()
+            if style.get(f"{W_NS}type") == "paragraph" and style.get(f"{W_NS}default") in ("1", "true"):
+                default_style = name.lower()
+    return style_names, default_style
+
+
+def _run_text(r_elem):
+    """
+    Text of a <w:r>, from the same child elements python-docx's Run.text reads.
+    """
+    parts = []
+    for child in r_elem:
+        tag = child.tag
+        if tag == f"{W_NS}t":
+            parts.append(child.text or "")
+        elif tag in (f"{W_NS}tab", f"{W_NS}ptab"):
+            parts.append("\t")
+        elif tag == f"{W_NS}br":
+            if child.get(f"{W_NS}type") in (None, "textWrapping"):
+                parts.append("\n")
+        elif tag == f"{W_NS}cr":
+            parts.append("\n")
+        elif tag == f"{W_NS}noBreakHyphen":
+            parts.append("-")
+    return "".join(parts)
+
+
+def _paragraph_text(p_elem):
+    """
+    Text of a <w:p> by python-docx's Paragraph.text rules: only direct runs and the runs of direct hyperlinks.
+    Like the default engine, this leaves out text inside tracked insertions (w:ins), content controls,
+    smart tags and text boxes, so both engines read the same text.
+    """
+    parts = []
+    for child in p_elem:
+        if child.tag == f"{W_NS}r":
+            parts.append(_run_text(child))
+        elif child.tag == f"{W_NS}hyperlink":
+            parts.extend(_run_text(run) for run in child if run.tag == f"{W_NS}r")
+    return "".join(parts)
 
-        return "\n\n".join(md_content)
 
+def _table_rows(tbl_elem):
+    """
+    Cell texts of a <w:tbl>, repeating horizontally and vertically merged cells like python-docx.
+    """
+    rows = []
+    for tr in tbl_elem.findall(f"{W_NS}tr"):
+        row = []
+        for tc in tr.findall(f"{W_NS}tc"):
+            tc_pr = tc.find(f"{W_NS}tcPr")
+            span = 1
+            continues_merge = False
+            if tc_pr is not None:
+                grid_span = tc_pr.find(f"{W_NS}gridSpan")
+                if grid_span is not None:
+                    span = int(grid_span.get(f"{W_NS}val", "1"))
+                v_merge = tc_pr.find(f"{W_NS}vMerge")
+                continues_merge = v_merge is not None and v_merge.get(f"{W_NS}val") in (None, "continue")
+
+            column = len(row)
+            if continues_merge and rows and column < len(rows[-1]):
+                cell_text = rows[-1][column]
+            else:
+                cell_text = "\n".join(_paragraph_text(p) for p in tc.findall(f"{W_NS}p"))
+            row.extend([cell_text] * span)
+        rows.append(row)
+    return rows
+
+
+def iter_docx_blocks_streaming(docx_path, images_output_dir):
+    """
+    Low-memory alternative to iter_docx_blocks.
+    Reads the main document part straight from the zip with iterparse and discards each
+    top-level block once converted. Images are copied out where they are referenced.
+    """
+    with zipfile.ZipFile(open_source(docx_path)) as archive, ImageStore(images_output_dir) as image_store:
+        package_rels = _read_rels(archive, "")
+        document_part = next(
+            (target for target, _, rel_type in package_rels.values() if rel_type == OFFICE_DOCUMENT_REL),
+            "word/document.xml",
+        )
+        rels = _read_rels(archive, document_part)
+        styles_part = next((target for target, _, rel_type in rels.values() if rel_type.endswith("/styles")), None)
+        style_names, default_style = _read_style_names(archive, styles_part)
+
+        # Helper: Copy an image out of the zip once per rId and return its markdown link
+        def image_links(elem):
+            links = []
+            for child in elem.iter():
+                if child.tag == f"{A_NS}blip":
+                    r_id = child.get(f"{R_NS}embed")
+                elif child.tag == f"{V_NS}imagedata":
+                    r_id = child.get(f"{R_NS}id")
+                else:
+                    continue
+                if r_id not in rels or rels[r_id][1]:
+                    continue
+
+                image_link = image_store.get(r_id)
+                if image_link is None:
+                    target = rels[r_id][0]
+                    with archive.open(target) as src:
+                        image_link = image_store.add_stream(src, target.split(".")[-1], key=r_id)
+                links.append(image_link)
+            return links
+
+        body = None
+        body_depth = None
+        depth = 0
+        with archive.open(document_part) as document_file:
+            for event, elem in ET.iterparse(document_file, events=("start", "end")):
+                if event == "start":
+                    depth += 1
+                    if elem.tag == f"{W_NS}body":
+                        body, body_depth = elem, depth
+                    continue
+
+                if body is not None and depth == body_depth + 1:
+                    if elem.tag == f"{W_NS}p":  # Paragraph
+                        text = _paragraph_text(elem).strip()
+                        if text:
+                            p_style = elem.find(f"{W_NS}pPr/{W_NS}pStyle")
+                            style_id = p_style.get(f"{W_NS}val") if p_style is not None else None
+                            yield heading_to_markdown(text, style_names.get(style_id, default_style))
+                        yield from image_links(elem)
+
+                    elif elem.tag == f"{W_NS}tbl":  # Table
+                        table_data = [
+                            [cell.strip().replace("\n", " ") or " " for cell in row]
+                            for row in _table_rows(elem)
+                        ]
+                        yield format_table_as_markdown(table_data, header=False)
+                        yield from image_links(elem)
+
+                    # Drop the converted block so the tree never holds more than one
+                    body.remove(elem)
+                depth -= 1
+
+
+def iter_docx_to_md(docx_path, output_md_path=None, images_output_dir=None, engine="python-docx", name=None):
+    """
+    Convert DOCX to Markdown one body block at a time.
+    Yields each block's markdown and appends it to output_md_path as it goes.
+    engine is "python-docx" (default) or "stream" for the low-memory iterparse reader.
+    docx_path may also be bytes or a binary file object; name then sets the output file names.
+    """
+    if engine not in DOCX_ENGINES:
+        raise ValueError(f"Unknown DOCX engine: {engine}")
+
+    base_name = source_base_name(docx_path, name)
+    if images_output_dir is None:
+        images_output_dir = os.path.join("output", "images")
+    if output_md_path is None:
+        output_md_path = os.path.join("output", f"{base_name}.md")
+
+    os.makedirs(images_output_dir, exist_ok=True)
+
+    iter_blocks = iter_docx_blocks_streaming if engine == "stream" else iter_docx_blocks
+    blocks = span_iter("docx.body_walk", iter_blocks(docx_path, images_output_dir))
+    yield from stream_markdown(blocks, output_md_path)
+
+
+def convert_docx_to_md(docx_path, output_md_path=None, images_output_dir=None, engine="python-docx", name=None):
+    """
+    Convert DOCX to Markdown, preserving the original sequence of text, tables, and images.
+    docx_path may be a path, bytes or a binary file object (name sets the output file names for the latter two).
+    engine="stream" parses word/document.xml incrementally for very large files;
+    it writes images where they are referenced rather than at the end.
+    """
+    try:
+        return "\n\n".join(iter_docx_to_md(docx_path, output_md_path, images_output_dir, engine, name))
+
+    except MemoryError:
+        # Left to the caller: batch_convert reports it as the worker hitting its memory cap
+        raise
     except Exception as e:
         print(f"Error processing DOCX: {e}")
         return None
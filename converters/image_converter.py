@@ -1,64 +1,347 @@
-import pytesseract
+import os
 import cv2
 from pathlib import Path
-import uuid
-import pandas as pd
 import numpy as np
+from converters.ocr_engine import image_to_data
+from converters.profiling import span
+from converters.utils import ImageStore, format_table_as_markdown, load_source, source_base_name
 
-# If Tesseract is not in PATH, uncomment and set correct path
-# pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+# Long side of the downscaled mask ruling lines are searched on
+GRID_DETECT_MAX_SIDE = 1000
 
-def extract_table_from_image(img):
+# Shortest ruling line, in full-resolution pixels, and the share of it that must be inked
+RULING_MIN_LENGTH = 80
+RULING_FILL = 0.9
+
+# Share of a table's width (height) a horizontal (vertical) ruling must span to separate rows (columns)
+SEPARATOR_MIN_COVERAGE = 0.5
+
+# Pixels trimmed inside each cell so ruling edges are not OCR'd
+CELL_PADDING = 2
+
+# White space between stacked cell crops, and the tallest strip handed to Tesseract at once
+CELL_GAP = 16
+CELL_BATCH_MAX_HEIGHT = 8000
+
+def ocr_words(gray):
     """
-    Detect and extract tables from an image using OpenCV and OCR.
-    Returns markdown table(s) as string.
+    Run one word-level Tesseract pass over an image (pooled engine when available).
+    Returns a list of dicts with text, box (left, top, width, height), confidence and line key.
     """
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    thresh = cv2.adaptiveThreshold(
+    data = image_to_data(gray, psm=6)
+
+    words = []
+    for i, text in enumerate(data["text"]):
+        text = text.strip()
+        conf = float(data["conf"][i])
+        if not text or conf < 0:
+            continue
+        words.append({
+            "text": text,
+            "left": data["left"][i],
+            "top": data["top"][i],
+            "width": data["width"][i],
+            "height": data["height"][i],
+            "conf": conf,
+            "line": (data["block_num"][i], data["par_num"][i], data["line_num"][i]),
+        })
+    return words
+
+
+def ink_mask(gray):
+    """
+    Boolean mask of dark (ink) pixels, robust to uneven lighting in scans.
+    The threshold window grows with the image so thick strokes at high resolution are filled.
+    """
+    block_size = max(15, min(gray.shape) // 100 | 1)
+    return cv2.adaptiveThreshold(
         gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C,
-        cv2.THRESH_BINARY_INV, 15, 8
-    )
+        cv2.THRESH_BINARY_INV, block_size, 8
+    ) > 0
 
-    # Detect horizontal lines
-    horizontal_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (40, 1))
-    detect_horizontal = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, horizontal_kernel, iterations=2)
 
-    # Detect vertical lines
-    vertical_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, 40))
-    detect_vertical = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, vertical_kernel, iterations=2)
+def _pool_lines(ink, scale):
+    """
+    Downscale an ink mask by scale, keeping only ink that runs unbroken along a block:
+    a block is horizontal-line ink if one of its pixel rows is fully inked, vertical-line ink
+    if one of its pixel columns is. Text strokes rarely fill blocks end to end, so they mostly drop out.
+    Returns (horizontal, vertical) masks of shape (height // scale, width // scale).
+    """
+    height, width = ink.shape[0] // scale * scale, ink.shape[1] // scale * scale
+    blocks = ink[:height, :width].reshape(height // scale, scale, width // scale, scale)
+    return blocks.all(axis=3).any(axis=1), blocks.all(axis=1).any(axis=2)
 
-    # Combine lines
-    table_mask = cv2.add(detect_horizontal, detect_vertical)
 
-    contours, _ = cv2.findContours(table_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    tables_md = []
+def _runs(mask, length, axis):
+    """
+    Mark the pixels of mask that belong to a run of at least length (at RULING_FILL density) along axis.
+    Vectorized with cumulative sums instead of morphology.
+    """
+    if axis == 0:
+        return _runs(mask.T, length, 1).T
+    if mask.shape[1] < length:
+        return np.zeros_like(mask)
 
-    for cnt in contours:
-        x, y, w, h = cv2.boundingRect(cnt)
-        if w > 50 and h > 30:  # Avoid small artifacts
-            table_roi = img[y:y+h, x:x+w]
-            table_text = pytesseract.image_to_string(table_roi, config="--psm 6")
-            rows = [r.strip() for r in table_text.split("\n") if r.strip()]
-            split_rows = [row.split() for row in rows]
-            if split_rows:
-                try:
-                    df = pd.DataFrame(split_rows)
-                    tables_md.append(df.to_markdown(index=False, headers=None))
-                except Exception:
-                    md_fallback = "\n".join(["| " + " | ".join(r) + " |" for r in split_rows])
-                    tables_md.append(md_fallback)
+    counts = np.cumsum(np.pad(mask, ((0, 0), (1, 0))), axis=1, dtype=np.int32)
+    starts = (counts[:, length:] - counts[:, :-length]) >= RULING_FILL * length
+
+    # Spread each qualifying window start over the length pixels it covers
+    covered = np.cumsum(np.pad(starts, ((0, 0), (length, length - 1))), axis=1, dtype=np.int32)
+    return (covered[:, length:] - covered[:, :-length]) > 0
+
+
+def _separators(profile, min_coverage):
+    """
+    Group consecutive profile entries at or above min_coverage into (first, last) index pairs.
+    """
+    hits = np.flatnonzero(profile >= min_coverage)
+    if not len(hits):
+        return []
+    breaks = np.flatnonzero(np.diff(hits) > 1)
+    firsts = np.concatenate(([hits[0]], hits[breaks + 1]))
+    lasts = np.concatenate((hits[breaks], [hits[-1]]))
+    return list(zip(firsts.tolist(), lasts.tolist()))
+
+
+def _refine(ink_band, offset):
+    """
+    Locate a ruling inside a full-resolution band of ink (rows of the band run along the ruling).
+    Returns (first, last) rows in image coordinates.
+    """
+    profile = ink_band.mean(axis=1)
+    hits = np.flatnonzero(profile >= profile.max() * 0.5)
+    return offset + int(hits[0]), offset + int(hits[-1])
+
+
+def detect_table_grids(gray, ink=None):
+    """
+    Find ruled tables and their cell grids.
+    Ruling lines are found on a downscaled line mask with vectorized run and projection profiles,
+    then each separator is refined on the full-resolution ink mask.
+    Returns a list of grids, top to bottom, each a dict with:
+    - box: (x, y, w, h) of the table
+    - rows, cols: (first, last) pixel extent of each horizontal / vertical separator
+    - cells: one list per table row of (x0, y0, x1, y1) boxes, None where a cell is merged into its left neighbour
+    """
+    if ink is None:
+        ink = ink_mask(gray)
+    scale = max(1, -(-max(gray.shape) // GRID_DETECT_MAX_SIDE))
+    horizontal, vertical = _pool_lines(ink, scale)
+
+    min_length = max(3, RULING_MIN_LENGTH // scale)
+    horizontal = _runs(horizontal, min_length, axis=1)
+    vertical = _runs(vertical, min_length, axis=0)
+
+    count, _, stats, _ = cv2.connectedComponentsWithStats((horizontal | vertical).astype(np.uint8), connectivity=8)
+    grids = []
+    for x, y, w, h, _ in stats[1:count]:
+        if w * scale <= 50 or h * scale <= 30:  # Avoid small artifacts
+            continue
+
+        # Separators: rows / columns of the region mostly covered by ruling ink
+        row_seps = _separators(horizontal[y:y + h, x:x + w].mean(axis=1), SEPARATOR_MIN_COVERAGE)
+        col_seps = _separators(vertical[y:y + h, x:x + w].mean(axis=0), SEPARATOR_MIN_COVERAGE)
+        if len(row_seps) < 2 or len(col_seps) < 2:
+            continue
+
+        x0, x1 = x * scale, (x + w) * scale
+        y0, y1 = y * scale, (y + h) * scale
+        rows = [_refine(ink[(y + a) * scale:(y + b + 1) * scale, x0:x1], (y + a) * scale) for a, b in row_seps]
+        cols = [_refine(ink[y0:y1, (x + a) * scale:(x + b + 1) * scale].T, (x + a) * scale) for a, b in col_seps]
+        grids.append({"box": (x0, y0, x1 - x0, y1 - y0), "rows": rows, "cols": cols, "cells": _grid_cells(ink, rows, cols)})
+
+    return sorted(grids, key=lambda grid: (grid["box"][1], grid["box"][0]))
+
+
+def _grid_cells(ink, rows, cols):
+    """
+    Cell boxes between consecutive separators, inset by CELL_PADDING.
+    A cell whose left separator is not actually drawn across it is merged into its left neighbour.
+    """
+    cells = []
+    for (_, top), (bottom, _) in zip(rows, rows[1:]):
+        top, bottom = top + 1 + CELL_PADDING, bottom - CELL_PADDING
+        row_cells = []
+        # Index of the cell to the left that this one would merge into (it may already span several columns)
+        owner = None
+        for index, ((_, left), (right, _)) in enumerate(zip(cols, cols[1:])):
+            left, right = left + 1 + CELL_PADDING, right - CELL_PADDING
+            if bottom - top < 4 or right - left < 4:
+                row_cells.append(None)
+                owner = None
+                continue
+
+            if owner is not None:
+                separator = ink[top:bottom, cols[index][0]:cols[index][1] + 1]
+                if separator.any(axis=1).mean() < SEPARATOR_MIN_COVERAGE:
+                    # No line between this cell and the one to its left: one merged cell
+                    x0, y0, _, y1 = row_cells[owner]
+                    row_cells[owner] = (x0, y0, right, y1)
+                    row_cells.append(None)
+                    continue
+            row_cells.append((left, top, right, bottom))
+            owner = len(row_cells) - 1
+        cells.append(row_cells)
+    return cells
+
+
+def detect_table_regions(img):
+    """
+    Find table regions in an image from its horizontal and vertical ruling lines.
+    Returns a list of (x, y, w, h) boxes.
+    """
+    gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    return [grid["box"] for grid in detect_table_grids(gray)]
+
+
+def group_words_into_lines(words):
+    """
+    Group OCR words into text lines, top to bottom, each line left to right.
+    """
+    lines = {}
+    for word in words:
+        lines.setdefault(word["line"], []).append(word)
+
+    ordered = sorted(lines.values(), key=lambda line: (min(w["top"] for w in line), min(w["left"] for w in line)))
+    return [[w["text"] for w in sorted(line, key=lambda w: w["left"])] for line in ordered]
+
+
+def ocr_cells(gray, ink, boxes):
+    """
+    OCR table cells in batches. Each cell is cropped to its ink and the crops are stacked
+    into tall strips, so Tesseract runs once per strip over little more than the cell text.
+    Returns the text of each box ("" for empty cells).
+    """
+    texts = [""] * len(boxes)
+    batch, batch_height = [], 0
+    for index, (x0, y0, x1, y1) in enumerate(boxes):
+        cell_ink = ink[y0:y1, x0:x1]
+        ys, xs = np.flatnonzero(cell_ink.any(axis=1)), np.flatnonzero(cell_ink.any(axis=0))
+        if not len(ys):
+            continue
+        crop = gray[y0 + ys[0]:y0 + ys[-1] + 1, x0 + xs[0]:x0 + xs[-1] + 1]
+
+        if batch and batch_height + crop.shape[0] + CELL_GAP > CELL_BATCH_MAX_HEIGHT:
+            _ocr_cell_batch(batch, texts)
+            batch, batch_height = [], 0
+        batch.append((index, crop))
+        batch_height += crop.shape[0] + CELL_GAP
+
+    if batch:
+        _ocr_cell_batch(batch, texts)
+    return texts
+
+
+def _ocr_cell_batch(batch, texts):
+    """
+    Stack the crops of one batch on a white strip, OCR it once and hand each word to the cell it came from.
+    """
+    width = max(crop.shape[1] for _, crop in batch) + 2 * CELL_GAP
+    height = sum(crop.shape[0] + CELL_GAP for _, crop in batch) + CELL_GAP
+    strip = np.full((height, width), 255, dtype=np.uint8)
+
+    starts = []
+    y = CELL_GAP
+    for _, crop in batch:
+        strip[y:y + crop.shape[0], CELL_GAP:CELL_GAP + crop.shape[1]] = crop
+        starts.append(y - CELL_GAP // 2)
+        y += crop.shape[0] + CELL_GAP
+
+    cell_words = [[] for _ in batch]
+    for word in ocr_words(strip):
+        position = int(np.searchsorted(starts, word["top"] + word["height"] / 2, side="right")) - 1
+        cell_words[max(position, 0)].append(word)
+
+    for (index, _), words in zip(batch, cell_words):
+        texts[index] = " ".join(" ".join(line) for line in group_words_into_lines(words))
+
+
+def extract_table_from_image(img, grids=None, ink=None):
+    """
+    Detect and extract tables from an image using OpenCV and OCR.
+    grids and ink can be passed from detect_table_grids() / ink_mask() on the same image
+    so neither is computed twice. The cells of every table are OCR'd together in batches.
+    Returns markdown table(s) as string.
+    """
+    gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    if ink is None:
+        ink = ink_mask(gray)
+    if grids is None:
+        grids = detect_table_grids(gray, ink)
+    if not grids:
+        return ""
+
+    boxes = [cell for grid in grids for row in grid["cells"] for cell in row if cell is not None]
+    texts = iter(ocr_cells(gray, ink, boxes))
+
+    tables_md = []
+    for grid in grids:
+        table_data = [[next(texts) if cell is not None else "" for cell in row] for row in grid["cells"]]
+        table_data = [[text or " " for text in row] for row in table_data if any(text for text in row)]
+        if table_data:
+            tables_md.append(format_table_as_markdown(table_data, header=False))
 
     return "\n\n".join(tables_md) if tables_md else ""
 
 
-def convert_image_to_md(image_path, output_dir="output"):
+def ocr_image(gray):
+    """
+    OCR a grayscale image: table grids cell by cell, then the free text around them.
+    Returns (text, table_md), either of which may be empty.
+    """
+    with span("ocr.tables") as stage:
+        ink = ink_mask(gray)
+        grids = detect_table_grids(gray, ink)
+        stage.count += len(grids)
+
+    with span("ocr.text") as stage:
+        # Tables are OCR'd cell by cell below; blank them out so their area is not read twice
+        text_gray = gray.copy() if grids else gray
+        for grid in grids:
+            x, y, w, h = grid["box"]
+            text_gray[y:y + h, x:x + w] = 255
+        words = ocr_words(text_gray)
+        stage.count += len(words)
+
+    text = "\n".join(" ".join(line) for line in group_words_into_lines(words)).strip()
+
+    with span("ocr.tables"):
+        table_md = extract_table_from_image(gray, grids, ink)
+    return text, table_md
+
+
+def image_extension(data, name=None):
+    """
+    File extension for an image: from its name if it has one, else sniffed from the bytes.
+    """
+    if name:
+        suffix = Path(str(name)).suffix.lstrip(".").lower()
+        if suffix:
+            return suffix
+    if data.startswith(b"\x89PNG"):
+        return "png"
+    if data.startswith(b"\xff\xd8"):
+        return "jpg"
+    return "png"
+
+
+def convert_image_to_md(image_path, output_dir="output", name=None):
     """
     Converts image to Markdown:
     - Saves original image
     - Extracts OCR text
     - Extracts tables
+    image_path may be a path, bytes or a binary file object (name sets the output file names for the latter two).
     """
-    image_path = Path(image_path)
+    stem = source_base_name(image_path, name)
+    if name is None and isinstance(image_path, (str, os.PathLike)):
+        name = image_path
+
+    # Read the input once; the same bytes are saved and decoded
+    data = load_source(image_path)
+    if isinstance(data, (str, os.PathLike)):
+        data = Path(data).read_bytes()
+
     output_dir = Path(output_dir)
     images_dir = output_dir / "images"
     output_dir.mkdir(parents=True, exist_ok=True)
@@ -67,32 +350,29 @@ def convert_image_to_md(image_path, output_dir="output"):
     markdown_lines = []
 
     # ---------- STEP 1: Save Original Image ----------
-    image_ext = image_path.suffix.lstrip(".")
-    image_name = f"{uuid.uuid4()}.{image_ext}"
-    saved_image_path = images_dir / image_name
-    with open(saved_image_path, "wb") as f:
-        f.write(open(str(image_path), "rb").read())
-
-    markdown_lines.append(f"![Image](images/{image_name})\n")
+    with ImageStore(images_dir) as image_store:
+        markdown_lines.append(image_store.add(data, image_extension(data, name)) + "\n")
 
     # ---------- STEP 2: Load Image ----------
-    img = cv2.imread(str(image_path))
+    with span("image.decode"):
+        img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError(f"Could not decode image: {stem}")
 
-    # ---------- STEP 3: Extract Text ----------
+    # ---------- STEP 3: Find table grids, OCR the text around them ----------
     gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    text = pytesseract.image_to_string(gray, config="--psm 6")
-    if text.strip():
+    text, table_md = ocr_image(gray)
+    if text:
         markdown_lines.append("## Extracted Text\n")
-        markdown_lines.append(text.strip() + "\n")
+        markdown_lines.append(text + "\n")
 
     # ---------- STEP 4: Extract Tables ----------
-    table_md = extract_table_from_image(img)
     if table_md:
         markdown_lines.append("## Extracted Table(s)\n")
         markdown_lines.append(table_md + "\n")
 
     # ---------- STEP 5: Save Markdown ----------
-    output_md_path = output_dir / f"{image_path.stem}.md"
+    output_md_path = output_dir / f"{stem}.md"
     with open(str(output_md_path), "w", encoding="utf-8") as md_file:
         md_file.write("\n".join(markdown_lines))
 
@@ -0,0 +1,380 @@
+"""
+Background conversion jobs on a shared process pool.
+
+A JobQueue owns a pool of worker processes that outlives any one request or
+Streamlit session. Jobs report per-page (PDF), per-slide (PPTX) or per-block
+(DOCX) progress back through a manager queue, can be cancelled while queued or
+between pages, and keep their markdown and stage report until pruned.
+
+Workers are started with the "spawn" method so they never inherit the threads
+of the hosting server.
+"""
+import io
+import multiprocessing
+import os
+import queue
+import re
+import threading
+import time
+import uuid
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from converters import get_converter, markdown_chunks, page_selector
+from converters.profiling import collect_report
+from converters.utils import parse_page_selection
+
+DEFAULT_IMAGES_DIR = os.path.join("output", "images")
+
+# Finished jobs kept for download before the oldest are dropped
+DEFAULT_MAX_FINISHED = 200
+
+ACTIVE_STATES = ("queued", "running")
+
+WORKER_DIED_ERROR = "Worker process died"
+
+SLIDE_PART_RE = re.compile(r"ppt/slides/slide\d+\.xml$")
+
+
+class QueueFull(Exception):
+    """
+    Raised by JobQueue.submit when max_pending jobs are already queued or running.
+    """
+
+
+class JobCancelled(Exception):
+    """
+    Raised inside a worker when its job is cancelled between pages.
+    """
+
+
+def count_units(file_ext, data, pages=None):
+    """
+    Number of pages (PDF) or slides (PPTX) a document will report progress over, or None if unknown up front.
+    pages is the page or slide selection the job converts.
+    """
+    if file_ext == "pdf":
+        import fitz
+        with fitz.open(stream=data, filetype="pdf") as pdf:
+            return len(parse_page_selection(pages, pdf.page_count))
+    if file_ext in ("ppt", "pptx"):
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            slide_count = sum(1 for part in archive.namelist() if SLIDE_PART_RE.match(part))
+        return len(parse_page_selection(pages, slide_count))
+    if file_ext in ("png", "jpg", "jpeg"):
+        return 1
+    return None
+
+
+def warm_up(formats):
+    """
+    Pool initializer: import the converters for formats so the first job does not pay for it.
+    """
+    for file_ext in formats:
+        get_converter(file_ext)
+
+
+def _noop():
+    return None
+
+
+def run_conversion(job_id, file_ext, data, name, images_dir, events=None, cancelled=None, stream=False,
+                   trace_memory=False, pages=None):
+    """
+    Worker entry point: convert one document held in memory.
+    pages selects the PDF pages or PPTX slides to convert (see parse_page_selection); other formats ignore it.
+    Sends ("start", job_id, total), ("progress", job_id, done, total, chunk) and finally ("end", job_id)
+    to events; chunk is the page's markdown when stream is set, else None.
+    Stops with JobCancelled between pages once cancelled[job_id] is set.
+    Returns {"markdown": ..., "report": ...}.
+    """
+    def emit(*event):
+        if events is not None:
+            events.put(event)
+
+    try:
+        with collect_report(trace_memory) as report:
+            try:
+                total = count_units(file_ext, data, pages)
+            except Exception:
+                total = None
+            emit("start", job_id, total)
+
+            chunks, separator = markdown_chunks(data, file_ext, images_dir, name, pages)
+            converted = []
+            for chunk in chunks:
+                converted.append(chunk)
+                emit("progress", job_id, len(converted), total, chunk if stream else None)
+                if cancelled is not None and cancelled.get(job_id):
+                    raise JobCancelled()
+            markdown = separator.join(converted)
+    finally:
+        emit("end", job_id)
+
+    return {"markdown": markdown, "report": report.as_dict()}
+
+
+class Job:
+    """
+    State of one submitted conversion, updated by the JobQueue as it runs.
+    """
+
+    def __init__(self, job_id, name, file_ext, stream=False, pages=None):
+        self.id = job_id
+        self.name = name
+        self.file_ext = file_ext
+        self.pages = pages
+        self.status = "queued"
+        self.done = 0
+        self.total = None
+        self.markdown = None
+        self.error = None
+        self.report = None
+        self.cached = False
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.future = None
+        # Page markdown as it is produced, then None, when submitted with stream=True
+        self.chunks = queue.Queue() if stream else None
+        self._finished_event = threading.Event()
+        self._discard = False
+
+    @property
+    def active(self):
+        return self.status in ACTIVE_STATES
+
+    @property
+    def progress(self):
+        """
+        Fraction of pages or slides done, or None while the total is unknown.
+        """
+        if self.status == "done":
+            return 1.0
+        if not self.total:
+            return None
+        return min(self.done / self.total, 1.0)
+
+    def wait(self, timeout=None):
+        """
+        Block until the job has finished; returns False on timeout.
+        """
+        return self._finished_event.wait(timeout)
+
+
+class JobQueue:
+    """
+    Process pool plus the bookkeeping for background conversions.
+    - workers: worker processes (default: CPU count)
+    - max_pending: submit raises QueueFull once this many jobs are queued or running (None for no limit)
+    - cache: optional ResultCache consulted before and filled after each conversion
+    - warm: import the converters for these formats in every worker up front
+    """
+
+    def __init__(self, workers=None, max_pending=None, images_dir=DEFAULT_IMAGES_DIR, cache=None, warm=(),
+                 max_finished=DEFAULT_MAX_FINISHED):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.images_dir = images_dir
+        self.cache = cache
+        self.max_finished = max_finished
+        os.makedirs(images_dir, exist_ok=True)
+
+        self._context = multiprocessing.get_context("spawn")
+        self._warm = tuple(warm)
+        self._manager = self._context.Manager()
+        self._events = self._manager.Queue()
+        self._cancelled = self._manager.dict()
+        self._pool = self._start_pool()
+        self._pool_lock = threading.Lock()
+
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._listener = threading.Thread(target=self._listen, name="job-events", daemon=True)
+        self._listener.start()
+
+    def pending_count(self):
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job.active)
+
+    def submit(self, data, name, file_ext=None, stream=False, trace_memory=False, pages=None):
+        """
+        Queue a conversion of data (the file's bytes) and return its Job straight away.
+        pages selects PDF pages or PPTX slides ("1-20", "3,7", "last 5"); it is ignored for other formats.
+        A result already in the cache completes the job without touching the pool.
+        """
+        file_ext = (file_ext or os.path.splitext(name)[1]).lower().lstrip(".")
+        if not page_selector(file_ext):
+            pages = None
+        job = Job(uuid.uuid4().hex, name, file_ext, stream, pages)
+
+        if self.cache is not None:
+            cache_key = self.cache.key(data, file_ext, {"pages": pages} if pages is not None else None)
+            markdown = self.cache.get(cache_key, self.images_dir)
+            if markdown is not None:
+                job.cached = True
+                with self._lock:
+                    self._jobs[job.id] = job
+                if job.chunks is not None:
+                    job.chunks.put(markdown)
+                    job.chunks.put(None)
+                self._complete(job, "done", markdown=markdown)
+                return job
+        else:
+            cache_key = None
+
+        with self._lock:
+            if self.max_pending is not None and sum(1 for j in self._jobs.values() if j.active) >= self.max_pending:
+                raise QueueFull(f"{self.max_pending} conversions already pending")
+            self._jobs[job.id] = job
+
+        pool = self._pool
+        try:
+            job.future = pool.submit(run_conversion, job.id, file_ext, data, name, self.images_dir,
+                                     self._events, self._cancelled, stream, trace_memory, pages)
+        except BrokenProcessPool:
+            # A worker died and _on_done has not replaced the pool yet; fail this job rather than leave it queued
+            self._replace_pool(pool)
+            job._discard = True
+            if job.chunks is not None:
+                job.chunks.put(None)
+            self._complete(job, "failed", error=WORKER_DIED_ERROR)
+            return job
+        job.future.add_done_callback(lambda future: self._on_done(job, future, cache_key, pool))
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self, job_ids=None):
+        """
+        Jobs in submission order, optionally only those in job_ids (e.g. one session's).
+        """
+        with self._lock:
+            if job_ids is None:
+                return list(self._jobs.values())
+            return [self._jobs[job_id] for job_id in job_ids if job_id in self._jobs]
+
+    def cancel(self, job_id):
+        """
+        Cancel a job: drop it if still queued, otherwise ask its worker to stop after the current page.
+        """
+        job = self.get(job_id)
+        if job is None or not job.active:
+            return False
+        if job.future is not None and not job.future.cancel():
+            self._cancelled[job_id] = True
+        return True
+
+    def discard(self, job_id):
+        """
+        Forget a job whose result has been delivered. An unfinished job is cancelled
+        and dropped once its worker lets go of it, so it still counts as pending until then.
+        """
+        job = self.get(job_id)
+        if job is None:
+            return
+        if job.active:
+            job._discard = True
+            self.cancel(job_id)
+        else:
+            with self._lock:
+                self._jobs.pop(job_id, None)
+
+    def _start_pool(self):
+        pool = ProcessPoolExecutor(self.workers, mp_context=self._context, initializer=warm_up,
+                                   initargs=(self._warm,))
+        if self._warm:
+            # Start every worker now instead of on the first submissions
+            for _ in range(self.workers):
+                pool.submit(_noop)
+        return pool
+
+    def _replace_pool(self, broken_pool):
+        """
+        Swap in a new pool for one broken by a worker that died (e.g. killed for memory); a broken pool never
+        runs another job. Every job on the broken pool reports it, so only the first one replaces it.
+        """
+        with self._pool_lock:
+            if self._pool is not broken_pool:
+                return
+            self._pool = self._start_pool()
+        broken_pool.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._events.put(None)
+        self._manager.shutdown()
+
+    def _listen(self):
+        while True:
+            try:
+                event = self._events.get()
+            except (EOFError, OSError):
+                return
+            if event is None:
+                return
+
+            job = self.get(event[1])
+            if job is None:
+                continue
+            if event[0] == "start":
+                if job.status == "queued":
+                    job.status = "running"
+                    job.started = time.time()
+                job.total = event[2]
+            elif event[0] == "progress":
+                job.done, job.total = event[2], event[3]
+                if job.chunks is not None and event[4] is not None:
+                    job.chunks.put(event[4])
+            elif event[0] == "end" and job.chunks is not None:
+                job.chunks.put(None)
+
+    def _on_done(self, job, future, cache_key, pool):
+        self._cancelled.pop(job.id, None)
+        if future.cancelled():
+            if job.chunks is not None:
+                job.chunks.put(None)
+            self._complete(job, "cancelled")
+            return
+
+        error = future.exception()
+        if isinstance(error, JobCancelled):
+            self._complete(job, "cancelled")
+        elif isinstance(error, BrokenProcessPool):
+            self._replace_pool(pool)
+            if job.chunks is not None:
+                job.chunks.put(None)
+            self._complete(job, "failed", error=WORKER_DIED_ERROR)
+        elif error is not None:
+            self._complete(job, "failed", error=str(error) or type(error).__name__)
+        else:
+            result = future.result()
+            if self.cache is not None and cache_key is not None:
+                try:
+                    self.cache.put(cache_key, result["markdown"], self.images_dir)
+                except Exception as e:
+                    # The result is still good; only later requests miss the cache
+                    print(f"Error caching result of {job.name}: {e}")
+            self._complete(job, "done", markdown=result["markdown"], report=result["report"])
+
+    def _complete(self, job, status, markdown=None, error=None, report=None):
+        job.markdown, job.error, job.report = markdown, error, report
+        if status == "done" and job.total:
+            job.done = job.total
+        job.finished = time.time()
+        job.status = status
+        job._finished_event.set()
+        if job._discard:
+            with self._lock:
+                self._jobs.pop(job.id, None)
+        self._prune()
+
+    def _prune(self):
+        with self._lock:
+            finished = [job_id for job_id, job in self._jobs.items() if not job.active]
+            for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+                del self._jobs[job_id]
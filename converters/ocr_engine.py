@@ -0,0 +1,120 @@
+"""
+OCR backend shared by the image converter.
+
+Uses tesserocr when it is installed: the Tesseract engine is loaded once per
+worker thread and reused for every image, instead of forking a tesseract
+binary (and reloading the language model) per call as pytesseract does.
+Falls back to pytesseract when tesserocr is missing or its engine cannot be
+started (e.g. it finds no tessdata), and keeps using it from then on.
+"""
+import threading
+
+try:
+    import tesserocr
+    from PIL import Image
+except ImportError:
+    tesserocr = None
+
+# Language model loaded by the pooled engine
+OCR_LANG = "eng"
+
+_local = threading.local()
+
+# Cleared once the pooled engine fails to start, so every later call goes straight to pytesseract
+_use_tesserocr = tesserocr is not None
+
+
+def ocr_backend():
+    """
+    Name of the OCR backend in use: "tesserocr" or "pytesseract".
+    """
+    return "tesserocr" if _use_tesserocr else "pytesseract"
+
+
+def _pytesseract():
+    """
+    Import pytesseract on first use; it is only needed when the pooled engine is not.
+    """
+    import pytesseract
+
+    # If Tesseract is not in PATH, uncomment and set correct path
+    # pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+    return pytesseract
+
+
+def _get_engine(psm):
+    """
+    Return this thread's tesserocr engine, creating it on first use.
+    Raises RuntimeError if Tesseract cannot be initialised.
+    """
+    api = getattr(_local, "api", None)
+    if api is None:
+        api = tesserocr.PyTessBaseAPI(lang=OCR_LANG)
+        _local.api = api
+    api.SetPageSegMode(psm)
+    return api
+
+
+def _image_to_data_tesserocr(api, gray):
+    """
+    Word-level OCR with the pooled engine, in pytesseract's Output.DICT layout (words only).
+    """
+    api.SetImage(Image.fromarray(gray))
+    api.Recognize()
+
+    data = {key: [] for key in ("text", "left", "top", "width", "height", "conf", "block_num", "par_num", "line_num")}
+    result = api.GetIterator()
+    if result is None:
+        return data
+
+    level = tesserocr.RIL.WORD
+    block_num = par_num = line_num = 0
+    for word in tesserocr.iterate_level(result, level):
+        if word.IsAtBeginningOf(tesserocr.RIL.BLOCK):
+            block_num += 1
+            par_num = line_num = 0
+        if word.IsAtBeginningOf(tesserocr.RIL.PARA):
+            par_num += 1
+            line_num = 0
+        if word.IsAtBeginningOf(tesserocr.RIL.TEXTLINE):
+            line_num += 1
+
+        try:
+            text = word.GetUTF8Text(level)
+        except RuntimeError:
+            # Raised for regions Tesseract found no text in (e.g. specks)
+            continue
+        box = word.BoundingBox(level)
+        if text is None or box is None:
+            continue
+        x0, y0, x1, y1 = box
+        data["text"].append(text)
+        data["left"].append(x0)
+        data["top"].append(y0)
+        data["width"].append(x1 - x0)
+        data["height"].append(y1 - y0)
+        data["conf"].append(word.Confidence(level))
+        data["block_num"].append(block_num)
+        data["par_num"].append(par_num)
+        data["line_num"].append(line_num)
+
+    return data
+
+
+def image_to_data(gray, psm=6):
+    """
+    Word-level OCR of a grayscale image.
+    Returns a dict of parallel lists like pytesseract.image_to_data(output_type=Output.DICT).
+    """
+    global _use_tesserocr
+    if _use_tesserocr:
+        try:
+            api = _get_engine(psm)
+        except RuntimeError as e:
+            print(f"tesserocr engine unavailable, falling back to pytesseract: {e}")
+            _use_tesserocr = False
+        else:
+            return _image_to_data_tesserocr(api, gray)
+
+    pytesseract = _pytesseract()
+    return pytesseract.image_to_data(gray, config=f"--psm {psm}", output_type=pytesseract.Output.DICT)
@@ -1,194 +1,797 @@
-# import os
-# import fitz  # PyMuPDF
-# import pdfplumber
-# import camelot
-# import uuid
-
-# def extract_text_from_pdf(pdf_path):
-#     """Extracts text using pdfplumber."""
-#     text_content = []
-#     with pdfplumber.open(pdf_path) as pdf:
-#         for page in pdf.pages:
-#             text = page.extract_text()
-#             if text:
-#                 text_content.append(text)
-#     return "\n".join(text_content)
-
-
-# def extract_tables_from_pdf(pdf_path):
-#     """Tries to extract tables using Camelot first, then falls back to pdfplumber."""
-#     tables_md = []
-#     try:
-#         # First try with Camelot (works for vector-based PDFs)
-#         tables = camelot.read_pdf(pdf_path, pages="all", flavor='lattice')
-#         if tables:
-#             for i, table in enumerate(tables):
-#                 tables_md.append(table.df.to_markdown(index=False))
-#     except Exception:
-#         pass  # Ignore Camelot errors
-
-#     # Fallback to pdfplumber table extraction
-#     try:
-#         with pdfplumber.open(pdf_path) as pdf:
-#             for page in pdf.pages:
-#                 tables = page.extract_tables()
-#                 for table in tables:
-#                     md_table = "\n".join(
-#                         ["| " + " | ".join(row) + " |" for row in table if any(row)]
-#                     )
-#                     tables_md.append(md_table)
-#     except Exception:
-#         pass  # Ignore any table extraction errors
-
-#     return "\n\n".join(tables_md)
-
-
-# def extract_images_from_pdf(pdf_path, output_dir):
-#     """Extracts images from the PDF and saves them in output_dir."""
-#     images_md = []
-#     pdf_name = os.path.splitext(os.path.basename(pdf_path))[0]
-
-#     with fitz.open(pdf_path) as pdf:
-#         for page_num, page in enumerate(pdf, start=1):
-#             for img_index, img in enumerate(page.get_images(full=True), start=1):
-#                 xref = img[0]
-#                 base_image = pdf.extract_image(xref)
-#                 image_bytes = base_image["image"]
-#                 image_ext = base_image["ext"]
-
-#                 image_filename = f"{pdf_name}_page{page_num}_{img_index}.{image_ext}"
-#                 image_path = os.path.join(output_dir, image_filename)
-
-#                 os.makedirs(output_dir, exist_ok=True)
-#                 with open(image_path, "wb") as img_file:
-#                     img_file.write(image_bytes)
-
-#                 images_md.append(f"![Image](images/{image_filename})")
-
-#     return "\n".join(images_md)
-
-
-# def convert_pdf_to_md(pdf_path, output_md_path=None, images_output_dir=None):
-#     """
-#     Main function to convert PDF to Markdown.
-#     If output_md_path or images_output_dir are not provided, defaults will be used.
-#     """
-#     try:
-#         # Set default output paths if not provided
-#         base_name = os.path.splitext(os.path.basename(pdf_path))[0]
-#         if images_output_dir is None:
-#             images_output_dir = os.path.join("output", "images")
-#         if output_md_path is None:
-#             output_md_path = os.path.join("output", f"{base_name}.md")
-
-#         # Ensure output directories exist
-#         os.makedirs(os.path.dirname(output_md_path), exist_ok=True)
-#         os.makedirs(images_output_dir, exist_ok=True)
-
-#         md_content = []
-
-#         # Extract text
-#         text_data = extract_text_from_pdf(pdf_path)
-#         if text_data.strip():
-#             md_content.append("# Extracted Text\n" + text_data)
-
-#         # Extract tables
-#         table_data = extract_tables_from_pdf(pdf_path)
-#         if table_data.strip():
-#             md_content.append("\n# Extracted Tables\n" + table_data)
-
-#         # Extract images
-#         image_data = extract_images_from_pdf(pdf_path, images_output_dir)
-#         if image_data.strip():
-#             md_content.append("\n# Extracted Images\n" + image_data)
-
-#         # Save Markdown file
-#         with open(output_md_path, "w", encoding="utf-8") as f:
-#             f.write("\n\n".join(md_content))
-
-#         return "\n\n".join(md_content)  # So main.py can display it directly
-
-#     except Exception as e:
-#         print(f"Error processing PDF: {e}")
-#         return None
-
-import os
-import fitz  # PyMuPDF
-import camelot
-import pdfplumber
-import pandas as pd
-
-def extract_pdf_content_in_order(pdf_path, images_output_dir):
-    """
-    Extract text, tables, and images from PDF in the order they appear.
-    """
-    md_content = []
-    pdf_name = os.path.splitext(os.path.basename(pdf_path))[0]
-
-    with fitz.open(pdf_path) as pdf:
-        for page_num, page in enumerate(pdf, start=1):
-            blocks = page.get_text("blocks")  # list of (x0, y0, x1, y1, text, block_no, type)
-            blocks.sort(key=lambda b: (b[1], b[0]))  # Sort top-to-bottom, left-to-right
-
-            for b in blocks:
-                text = b[4].strip()
-                if not text:
-                    continue
-
-                # Replace plain URLs with markdown links
-                links = page.get_links()
-                for link in links:
-                    if "uri" in link:
-                        uri = link["uri"]
-                        if uri in text:
-                            text = text.replace(uri, f"[{uri}]({uri})")
-
-                md_content.append(text)
-
-            # Try extracting tables with Camelot
-            try:
-                tables = camelot.read_pdf(pdf_path, pages=str(page_num), flavor='lattice')
-                for table in tables:
-                    df = table.df
-                    md_table = df.to_markdown(index=False, headers=df.iloc[0] if len(df) > 1 else None)
-                    md_content.append(md_table)
-            except:
-                pass
-
-            # Extract images
-            for img_index, img in enumerate(page.get_images(full=True), start=1):
-                xref = img[0]
-                base_image = pdf.extract_image(xref)
-                image_bytes = base_image["image"]
-                image_ext = base_image["ext"]
-
-                image_filename = f"{pdf_name}_page{page_num}_{img_index}.{image_ext}"
-                image_path = os.path.join(images_output_dir, image_filename)
-                os.makedirs(images_output_dir, exist_ok=True)
-                with open(image_path, "wb") as img_file:
-                    img_file.write(image_bytes)
-
-                md_content.append(f"![Image](images/{image_filename})")
-
-    return "\n\n".join(md_content)
-
-def convert_pdf_to_md(pdf_path, output_md_path=None, images_output_dir=None):
-    try:
-        base_name = os.path.splitext(os.path.basename(pdf_path))[0]
-        if images_output_dir is None:
-            images_output_dir = os.path.join("output", "images")
-        if output_md_path is None:
-            output_md_path = os.path.join("output", f"{base_name}.md")
-
-        os.makedirs(os.path.dirname(output_md_path), exist_ok=True)
-        os.makedirs(images_output_dir, exist_ok=True)
-
-        md_content = extract_pdf_content_in_order(pdf_path, images_output_dir)
-
-        with open(output_md_path, "w", encoding="utf-8") as f:
-            f.write(md_content)
-
-        return md_content
-    except Exception as e:
-        print(f"Error processing PDF: {e}")
-        return None
+# import os
+# import fitz  # PyMuPDF
+# import pdfplumber
+# import camelot
+# import uuid
+
+# def extract_text_from_pdf(pdf_path):
+#     """Extracts text using pdfplumber."""
+#     text_content = []
+#     with pdfplumber.open(pdf_path) as pdf:
+#         for page in pdf.pages:
+#             text = page.extract_text()
+#             if text:
+#                 text_content.append(text)
+#     return "\n".join(text_content)
+
+
+# def extract_tables_from_pdf(pdf_path):
+#     """Tries to extract tables using Camelot first, then falls back to pdfplumber."""
+#     tables_md = []
+#     try:
+#         # First try with Camelot (works for vector-based PDFs)
+#         tables = camelot.read_pdf(pdf_path, pages="all", flavor='lattice')
+#         if tables:
+#             for i, table in enumerate(tables):
+#                 tables_md.append(table.df.to_markdown(index=False))
+#     except Exception:
+#         pass  # Ignore Camelot errors
+
+#     # Fallback to pdfplumber table extraction
+#     try:
+#         with pdfplumber.open(pdf_path) as pdf:
+#             for page in pdf.pages:
+#                 tables = page.extract_tables()
+#                 for table in tables:
+#                     md_table = "\n".join(
+#                         ["| " + " | ".join(row) + " |" for row in table if any(row)]
+#                     )
+#                     tables_md.append(md_table)
+#     except Exception:
+#         pass  # Ignore any table extraction errors
+
+#     return "\n\n".join(tables_md)
+
+
+# def extract_images_from_pdf(pdf_path, output_dir):
+#     """Extracts images from the PDF and saves them in output_dir."""
+#     images_md = []
+#     pdf_name = os.path.splitext(os.path.basename(pdf_path))[0]
+
+#     with fitz.open(pdf_path) as pdf:
+#         for page_num, page in enumerate(pdf, start=1):
+#             for img_index, img in enumerate(page.get_images(full=True), start=1):
+#                 xref = img[0]
+#                 base_image = pdf.extract_image(xref)
+#                 image_bytes = base_image["image"]
+#                 image_ext = base_image["ext"]
+
+#                 image_filename = f"{pdf_name}_page{page_num}_{img_index}.{image_ext}"
+#                 image_path = os.path.join(output_dir, image_filename)
+
+#                 os.makedirs(output_dir, exist_ok=True)
+#                 with open(image_path, "wb") as img_file:
+#                     img_file.write(image_bytes)
+
+#                 images_md.append(f"![Image](images/{image_filename})")
+
+#     return "\n".join(images_md)
+
+
+# def convert_pdf_to_md(pdf_path, output_md_path=None, images_output_dir=None):
+#     """
+#     Main function to convert PDF to Markdown.
+#     If output_md_path or images_output_dir are not provided, defaults will be used.
+#     """
+#     try:
+#         # Set default output paths if not provided
+#         base_name = os.path.splitext(os.path.basename(pdf_path))[0]
+#         if images_output_dir is None:
+#             images_output_dir = os.path.join("output", "images")
+#         if output_md_path is None:
+#             output_md_path = os.path.join("output", f"{base_name}.md")
+
+#         # Ensure output directories exist
+#         os.makedirs(os.path.dirname(output_md_path), exist_ok=True)
+#         os.makedirs(images_output_dir, exist_ok=True)
+
+#         md_content = []
+
+#         # Extract text
+#         text_data = extract_text_from_pdf(pdf_path)
+#         if text_data.strip():
+#             md_content.append("# Extracted Text\n" + text_data)
+
+#         # Extract tables
+#         table_data = extract_tables_from_pdf(pdf_path)
+#         if table_data.strip():
+#             md_content.append("\n# Extracted Tables\n" + table_data)
+
+#         # Extract images
+#         image_data = extract_images_from_pdf(pdf_path, images_output_dir)
+#         if image_data.strip():
+#             md_content.append("\n# Extracted Images\n" + image_data)
+
+#         # Save Markdown file
+#         with open(output_md_path, "w", encoding="utf-8") as f:
+#             f.write("\n\n".join(md_content))
+
+#         return "\n\n".join(md_content)  # So main.py can display it directly
+
+#     except Exception as e:
+#         print(f"Error processing PDF: {e}")
+#         return None
+
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import time
+import fitz  # PyMuPDF
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from converters import CONVERTER_VERSIONS
+from converters.cache import linked_images
+from converters.profiling import span
+from converters.utils import (ImageStore, format_table_as_markdown, load_source, parse_page_selection,
+                              source_base_name, stream_markdown, write_file_atomic)
+
+# Number of pages handed to a single Camelot call
+TABLE_CHUNK_SIZE = 50
+
+# Page ranges per worker when converting in parallel, so slow ranges even out
+PARALLEL_SHARDS_PER_WORKER = 4
+
+# Table detection modes for convert_pdf_to_md
+TABLE_DETECTION_MODES = ("auto", "all", "off")
+
+# A page needs at least this many horizontal and vertical rulings to be sent to Camelot
+TABLE_MIN_RULINGS = 2
+
+# Segments shorter than this (in points) are ignored when counting rulings
+RULING_MIN_LENGTH = 5.0
+
+# Rectangles thinner than this (in points) are treated as a single ruling
+RULING_MAX_THICKNESS = 2.0
+
+# OCR modes for convert_pdf_to_md: pages without a text layer, every page, or none
+OCR_MODES = ("auto", "all", "off")
+
+# Resolution scanned pages are rendered at for OCR
+OCR_DPI = 300
+
+# Rendered pages waiting for an OCR worker, per worker
+OCR_PAGES_AHEAD_PER_WORKER = 2
+
+
+def count_page_rulings(page):
+    """
+    Count the horizontal and vertical ruling segments drawn on a PyMuPDF page.
+    Lines and rectangle edges are counted; curves and diagonals are ignored.
+    """
+    horizontal = 0
+    vertical = 0
+
+    for path in page.get_drawings():
+        for item in path["items"]:
+            if item[0] == "l":
+                p1, p2 = item[1], item[2]
+                dx, dy = abs(p2.x - p1.x), abs(p2.y - p1.y)
+                if dy <= RULING_MAX_THICKNESS and dx >= RULING_MIN_LENGTH:
+                    horizontal += 1
+                elif dx <= RULING_MAX_THICKNESS and dy >= RULING_MIN_LENGTH:
+                    vertical += 1
+
+            elif item[0] == "re":
+                rect = item[1]
+                if rect.height <= RULING_MAX_THICKNESS and rect.width >= RULING_MIN_LENGTH:
+                    horizontal += 1
+                elif rect.width <= RULING_MAX_THICKNESS and rect.height >= RULING_MIN_LENGTH:
+                    vertical += 1
+                elif rect.width >= RULING_MIN_LENGTH and rect.height >= RULING_MIN_LENGTH:
+                    horizontal += 2
+                    vertical += 2
+
+    return horizontal, vertical
+
+
+def page_may_have_table(page, min_rulings=TABLE_MIN_RULINGS):
+    """
+    Cheap check for whether a page could hold a lattice table.
+    Returns (is_candidate, (horizontal, vertical)).
+    """
+    horizontal, vertical = count_page_rulings(page)
+    return horizontal >= min_rulings and vertical >= min_rulings, (horizontal, vertical)
+
+
+def select_table_pages(pdf, page_numbers, table_detection="auto", report=False):
+    """
+    Decide which of the given pages of an open PyMuPDF document go through Camelot.
+    - "auto": only pages whose rulings pass the prefilter
+    - "all": every page
+    - "off": no pages
+    """
+    if table_detection not in TABLE_DETECTION_MODES:
+        raise ValueError(f"Unknown table_detection mode: {table_detection}")
+
+    if table_detection == "all":
+        return list(page_numbers)
+    if table_detection == "off":
+        return []
+
+    table_pages = []
+    for page_num in page_numbers:
+        page = pdf[page_num - 1]
+        is_candidate, (horizontal, vertical) = page_may_have_table(page)
+        if is_candidate:
+            table_pages.append(page_num)
+        if report:
+            decision = "detect" if is_candidate else "skip"
+            print(f"Page {page_num}: {horizontal} horizontal / {vertical} vertical rulings -> {decision}")
+
+    return table_pages
+
+
+def extract_tables_by_page(pdf_path, page_numbers, chunk_size=TABLE_CHUNK_SIZE):
+    """
+    Run Camelot lattice detection over the given pages in batched passes.
+    Returns a dict mapping page number to its markdown tables, in page order.
+    """
+    tables_by_page = {}
+    page_numbers = sorted(page_numbers)
+    if not page_numbers:
+        return tables_by_page
+
+    # Camelot pulls in pandas and OpenCV, so only import it once a page needs it
+    import camelot
+
+    for start in range(0, len(page_numbers), chunk_size):
+        chunk = page_numbers[start:start + chunk_size]
+        try:
+            with span("pdf.camelot", count=len(chunk)):
+                tables = camelot.read_pdf(pdf_path, pages=",".join(str(n) for n in chunk), flavor='lattice')
+        except Exception:
+            # One bad page should not cost the whole chunk its tables
+            if len(chunk) > 1:
+                for page_num, page_tables in extract_tables_by_page(pdf_path, chunk, chunk_size=1).items():
+                    tables_by_page[page_num] = page_tables
+            continue
+
+        for table in tables:
+            rows = table.df.values.tolist()
+            md_table = format_table_as_markdown(rows, header=len(rows) > 1)
+            if md_table:
+                tables_by_page.setdefault(int(table.page), []).append(md_table)
+
+    return tables_by_page
+
+
+def page_text_blocks(page):
+    """
+    The page's text layer as (x0, y0, x1, y1, text, block_no, type) blocks, top-to-bottom, left-to-right.
+    """
+    with span("pdf.blocks") as stage:
+        blocks = page.get_text("blocks")
+        blocks.sort(key=lambda b: (b[1], b[0]))
+        stage.count += len(blocks)
+    return blocks
+
+
+def page_needs_ocr(page, ocr="auto", blocks=None):
+    """
+    Whether a page's text has to come from OCR instead of its text layer.
+    - "auto": pages with no text layer that still draw something (a scan, or text outlined as paths)
+    - "all": every page
+    - "off": no pages
+    blocks is the page's text layer if it was already extracted (see page_text_blocks).
+    """
+    if ocr not in OCR_MODES:
+        raise ValueError(f"Unknown ocr mode: {ocr}")
+
+    if ocr == "all":
+        return True
+    if ocr == "off":
+        return False
+    if blocks is None:
+        blocks = page_text_blocks(page)
+    if any(b[4].strip() for b in blocks):
+        return False
+    return bool(page.get_images() or page.get_drawings())
+
+
+def render_page_gray(page, dpi=OCR_DPI):
+    """
+    Render a page to a grayscale numpy array at dpi, ready for OCR.
+    """
+    import numpy as np
+
+    pixmap = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+    samples = np.frombuffer(pixmap.samples, dtype=np.uint8).reshape(pixmap.height, pixmap.stride)
+    return np.ascontiguousarray(samples[:, :pixmap.width])
+
+
+def limit_ocr_threads():
+    """
+    OCR pool initializer: one Tesseract thread per worker, since the pool already keeps every CPU busy.
+    """
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+
+def ocr_page_image(gray):
+    """
+    OCR a rendered page with the image converter's pipeline; runs in a worker process when pooled.
+    Returns the page's markdown blocks: its text, then its tables.
+    """
+    # OpenCV and Tesseract are only needed once a page has no text layer
+    from converters.image_converter import ocr_image
+
+    return [block for block in ocr_image(gray) if block]
+
+
+def ocr_fallback(page_num, error):
+    """
+    Markdown blocks for a page whose OCR failed: none, so the page keeps only its images and tables.
+    OCR backends are optional for PDFs, so a missing or broken one must not fail the whole document.
+    """
+    print(f"OCR failed on page {page_num}, keeping its images only: {error}")
+    return []
+
+
+def collect_page_links(page):
+    """
+    Return the page's URI links as a list of (rect, uri) pairs.
+    """
+    return [(fitz.Rect(link["from"]), link["uri"]) for link in page.get_links() if link.get("uri")]
+
+
+def link_block_text(text, block_rect, page_links):
+    """
+    Wrap the URIs of links overlapping block_rect as markdown links in a single pass.
+    Each occurrence is wrapped once, even if the same URI is linked several times.
+    """
+    uris = {uri for link_rect, uri in page_links if link_rect.intersects(block_rect) and uri in text}
+    if not uris:
+        return text
+
+    # Longest first so a URI that prefixes another does not split it
+    pattern = re.compile("|".join(re.escape(uri) for uri in sorted(uris, key=len, reverse=True)))
+    return pattern.sub(lambda m: f"[{m.group(0)}]({m.group(0)})", text)
+
+
+def page_to_markdown(pdf, page, image_store, page_tables, blocks=None):
+    """
+    Convert a single page to a list of markdown blocks (text, tables, images).
+    blocks is the page's text layer if it was already extracted (see page_text_blocks);
+    pass [] to leave the text out, for pages whose text comes from OCR.
+    """
+    md_blocks = []
+
+    if blocks is None:
+        blocks = page_text_blocks(page)
+
+    # Collect the page's URI links once and match them to blocks by position
+    with span("pdf.links") as stage:
+        page_links = collect_page_links(page)
+        stage.count += len(page_links)
+
+    for b in blocks:
+        text = b[4].strip()
+        if not text:
+            continue
+
+        if page_links:
+            with span("pdf.links"):
+                text = link_block_text(text, fitz.Rect(b[:4]), page_links)
+
+        md_blocks.append(text)
+
+    # Tables found by Camelot on this page
+    md_blocks.extend(page_tables)
+
+    # Extract images, reading each xref only the first time it is seen
+    with span("pdf.images") as stage:
+        for img in page.get_images(full=True):
+            xref = img[0]
+            image_link = image_store.get(xref)
+            if image_link is None:
+                base_image = pdf.extract_image(xref)
+                image_link = image_store.add(base_image["image"], base_image["ext"], key=xref)
+
+            md_blocks.append(image_link)
+            stage.count += 1
+
+    return md_blocks
+
+
+def open_pdf(pdf_path):
+    """
+    Open a PDF from a path or from bytes already in memory.
+    """
+    if isinstance(pdf_path, bytes):
+        return fitz.open(stream=pdf_path, filetype="pdf")
+    return fitz.open(pdf_path)
+
+
+def convert_page(pdf, page, image_store, page_tables, ocr="auto", ocr_dpi=OCR_DPI, blocks=None):
+    """
+    Convert a single page to markdown blocks, OCR'ing it in this process if it has no usable text layer.
+    blocks is the page's text layer if the caller already extracted it (see page_text_blocks).
+    """
+    # The text layer is read once, both to decide on OCR and for the markdown
+    if blocks is None and ocr != "all":
+        blocks = page_text_blocks(page)
+    if not page_needs_ocr(page, ocr, blocks):
+        return page_to_markdown(pdf, page, image_store, page_tables, blocks)
+
+    with span("pdf.render", count=1):
+        gray = render_page_gray(page, ocr_dpi)
+    with span("pdf.ocr", count=1):
+        try:
+            ocr_blocks = ocr_page_image(gray)
+        except Exception as e:
+            ocr_blocks = ocr_fallback(page.number + 1, e)
+    return ocr_blocks + page_to_markdown(pdf, page, image_store, page_tables, blocks=[])
+
+
+def iter_selected_pages(pdf_path, images_output_dir, page_numbers, table_detection="auto", table_report=False,
+                        ocr="auto", ocr_dpi=OCR_DPI, ocr_workers=1, ocr_report=False):
+    """
+    Yield one list of markdown blocks per page for the given 1-based page numbers, in that order.
+    Only those pages are loaded, and only they go through table detection; tables are detected
+    one chunk of TABLE_CHUNK_SIZE pages at a time, so memory does not grow with the selection.
+    Pages without a text layer (see page_needs_ocr) are rendered at ocr_dpi and OCR'd. With
+    ocr_workers > 1 the OCR runs in a process pool while the following pages are rendered, with
+    at most OCR_PAGES_AHEAD_PER_WORKER rendered pages per worker waiting; pages still come out in order.
+    ocr_report prints the OCR throughput in pages per minute.
+    pdf_path may be a path or the PDF's bytes.
+    """
+    if ocr_workers is None or ocr_workers < 1:
+        ocr_workers = os.cpu_count() or 1
+    max_ahead = ocr_workers * OCR_PAGES_AHEAD_PER_WORKER
+
+    # (page number, markdown blocks, future of the OCR blocks or None), in page order
+    pending = deque()
+    executor = None
+    ocr_pages = 0
+    ocr_start = None
+
+    def finish(entry):
+        page_num, page_blocks, future = entry
+        if future is None:
+            return page_blocks
+        with span("pdf.ocr", count=1):
+            try:
+                return future.result() + page_blocks
+            except Exception as e:
+                return ocr_fallback(page_num, e) + page_blocks
+
+    try:
+        with open_pdf(pdf_path) as pdf, ImageStore(images_output_dir) as image_store:
+            for chunk_start in range(0, len(page_numbers), TABLE_CHUNK_SIZE):
+                chunk = page_numbers[chunk_start:chunk_start + TABLE_CHUNK_SIZE]
+
+                # Detect tables for the whole chunk up front instead of reparsing the file per page
+                table_pages = select_table_pages(pdf, chunk, table_detection, report=table_report)
+                tables_by_page = extract_tables_by_page(pdf_path, table_pages)
+
+                for page_num in chunk:
+                    page = pdf[page_num - 1]
+                    page_tables = tables_by_page.get(page_num, [])
+                    blocks = None if ocr == "all" else page_text_blocks(page)
+                    needs_ocr = page_needs_ocr(page, ocr, blocks)
+                    if needs_ocr:
+                        if ocr_start is None:
+                            ocr_start = time.perf_counter()
+                        ocr_pages += 1
+
+                    if needs_ocr and ocr_workers > 1:
+                        with span("pdf.render", count=1):
+                            gray = render_page_gray(page, ocr_dpi)
+                        if executor is None:
+                            # Spawned, not forked: the ImageStore's writer threads are running by now
+                            executor = ProcessPoolExecutor(max_workers=ocr_workers,
+                                                           mp_context=multiprocessing.get_context("spawn"),
+                                                           initializer=limit_ocr_threads)
+                        pending.append((page_num, page_to_markdown(pdf, page, image_store, page_tables, blocks=[]),
+                                        executor.submit(ocr_page_image, gray)))
+                    else:
+                        pending.append((page_num, convert_page(pdf, page, image_store, page_tables, ocr, ocr_dpi,
+                                                               blocks), None))
+
+                    # Hand back every page that is ready, and wait on the oldest scan once enough are rendered ahead
+                    while pending and (pending[0][2] is None or pending[0][2].done()
+                                       or sum(1 for _, _, future in pending if future is not None) >= max_ahead):
+                        yield finish(pending.popleft())
+
+            while pending:
+                yield finish(pending.popleft())
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    if ocr_report and ocr_pages:
+        seconds = time.perf_counter() - ocr_start
+        print(f"OCR: {ocr_pages} page(s) at {ocr_dpi} dpi in {seconds:.1f}s "
+              f"({ocr_pages * 60 / seconds:.1f} pages/min, {ocr_workers} worker(s))")
+
+
+def convert_selected_pages(pdf_path, images_output_dir, page_numbers, table_detection="auto", table_report=False,
+                           ocr="auto", ocr_dpi=OCR_DPI, ocr_workers=1, ocr_report=False):
+    """
+    Convert the given 1-based pages of a PDF.
+    Opens its own document so it can run in a worker process.
+    Returns one list of markdown blocks per page.
+    """
+    return list(iter_selected_pages(pdf_path, images_output_dir, page_numbers, table_detection, table_report,
+                                    ocr, ocr_dpi, ocr_workers, ocr_report))
+
+
+def split_page_numbers(page_numbers, workers, shards_per_worker=PARALLEL_SHARDS_PER_WORKER):
+    """
+    Split a list of page numbers into consecutive shards for the worker pool.
+    """
+    shard_count = max(1, min(len(page_numbers), workers * shards_per_worker))
+    shard_size, remainder = divmod(len(page_numbers), shard_count)
+
+    shards = []
+    start = 0
+    for shard in range(shard_count):
+        size = shard_size + (1 if shard < remainder else 0)
+        shards.append(page_numbers[start:start + size])
+        start += size
+    return shards
+
+
+def iter_pdf_pages(pdf_path, images_output_dir, table_detection="auto", table_report=False, workers=1, pages=None,
+                   ocr="auto", ocr_dpi=OCR_DPI, ocr_workers=1, ocr_report=False):
+    """
+    Yield one list of markdown blocks per selected page, in page order.
+    pages selects the pages to convert (see parse_page_selection); None converts them all.
+    With workers > 1, shards of pages are converted in a process pool and handed back in page order;
+    only a bounded number of shards is in flight at once. Each shard then OCRs its own scanned pages,
+    so ocr_workers only applies when workers is 1.
+    """
+    with open_pdf(pdf_path) as pdf:
+        page_numbers = parse_page_selection(pages, pdf.page_count)
+
+    if workers is None or workers < 1:
+        workers = os.cpu_count() or 1
+
+    if workers == 1 or len(page_numbers) < 2:
+        yield from iter_selected_pages(pdf_path, images_output_dir, page_numbers, table_detection, table_report,
+                                       ocr, ocr_dpi, ocr_workers, ocr_report)
+        return
+
+    shards = split_page_numbers(page_numbers, workers)
+    max_workers = min(workers, len(shards))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        for shard in shards:
+            pending.append(executor.submit(
+                convert_selected_pages, pdf_path, images_output_dir, shard, table_detection, table_report,
+                ocr, ocr_dpi, 1, ocr_report
+            ))
+            # Hand back finished shards in submission order so pages stay in document order
+            if len(pending) >= max_workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def extract_pdf_content_in_order(pdf_path, images_output_dir, table_detection="auto", table_report=False, workers=1,
+                                 pages=None, ocr="auto", ocr_dpi=OCR_DPI, ocr_workers=1):
+    """
+    Extract text, tables, and images from PDF in the order they appear.
+    """
+    md_content = []
+    for page_blocks in iter_pdf_pages(pdf_path, images_output_dir, table_detection, table_report, workers, pages,
+                                      ocr, ocr_dpi, ocr_workers):
+        md_content.extend(page_blocks)
+    return "\n\n".join(md_content)
+
+
+def iter_pdf_to_md(pdf_path, output_md_path=None, images_output_dir=None, table_detection="auto",
+                   table_report=False, workers=1, name=None, pages=None, ocr="auto", ocr_dpi=OCR_DPI, ocr_workers=1,
+                   ocr_report=False):
+    """
+    Convert a PDF to Markdown one page at a time.
+    Yields the markdown of each non-empty page and appends it to output_md_path as it goes.
+    pdf_path may also be bytes or a binary file object; name then sets the output file names.
+    """
+    base_name = source_base_name(pdf_path, name)
+    pdf_path = load_source(pdf_path)
+    if images_output_dir is None:
+        images_output_dir = os.path.join("output", "images")
+    if output_md_path is None:
+        output_md_path = os.path.join("output", f"{base_name}.md")
+
+    os.makedirs(images_output_dir, exist_ok=True)
+
+    pages_md = (
+        "\n\n".join(page_blocks)
+        for page_blocks in iter_pdf_pages(pdf_path, images_output_dir, table_detection, table_report, workers, pages,
+                                          ocr, ocr_dpi, ocr_workers, ocr_report)
+        if page_blocks
+    )
+    yield from stream_markdown(pages_md, output_md_path)
+
+
+def convert_pdf_to_md(pdf_path, output_md_path=None, images_output_dir=None, table_detection="auto",
+                      table_report=False, workers=1, name=None, pages=None, ocr="auto", ocr_dpi=OCR_DPI, ocr_workers=1,
+                      ocr_report=False):
+    """
+    Convert a PDF to Markdown and save it to output_md_path.
+    pdf_path may be a path, bytes or a binary file object (name sets the output file names for the latter two).
+    table_detection picks the pages sent to Camelot: "auto" (ruling prefilter), "all" or "off".
+    table_report prints the per-page prefilter decision.
+    workers > 1 converts page ranges in that many processes (None or 0 uses every CPU).
+    pages limits the conversion to some pages: "1-20", "3,7,9-12", "40-", "last 5" or a list of numbers.
+    ocr picks the pages whose text is OCR'd from a render at ocr_dpi: "auto" (no text layer), "all" or "off".
+    OCR needs OpenCV and Tesseract; if it fails, the page keeps only its images and tables.
+    ocr_workers > 1 OCRs scanned pages in that many processes (None or 0 uses every CPU);
+    ocr_report prints the OCR throughput in pages per minute.
+    """
+    try:
+        return "\n\n".join(
+            iter_pdf_to_md(pdf_path, output_md_path, images_output_dir, table_detection, table_report, workers, name,
+                           pages, ocr, ocr_dpi, ocr_workers, ocr_report)
+        )
+    except MemoryError:
+        # Left to the caller: batch_convert reports it as the worker hitting its memory cap
+        raise
+    except Exception as e:
+        print(f"Error processing PDF: {e}")
+        return None
+
+
+# Index of the per-page fragments kept for incremental reconversion
+FRAGMENT_INDEX_NAME = "index.json"
+
+
+def _digest_resource(pdf, xref, kind, memo):
+    """
+    SHA-256 of a page resource's content, computed once per xref and document.
+    Hashing content rather than xref numbers keeps fingerprints stable when a revision renumbers objects.
+    """
+    if (kind, xref) in memo:
+        return memo[(kind, xref)]
+
+    digest = hashlib.sha256(kind.encode("ascii"))
+    if kind == "image":
+        digest.update(pdf.xref_stream_raw(xref) or b"")
+    elif kind == "form":
+        digest.update(pdf.xref_stream(xref) or b"")
+    elif kind == "font":
+        # Text extraction depends on the font program and its ToUnicode map
+        name, ext, font_type, buffer = pdf.extract_font(xref)
+        digest.update(f"{name}|{ext}|{font_type}".encode("utf-8"))
+        digest.update(buffer or b"")
+        key_type, value = pdf.xref_get_key(xref, "ToUnicode")
+        if key_type == "xref":
+            digest.update(pdf.xref_stream(int(value.split()[0])) or b"")
+
+    memo[(kind, xref)] = digest.hexdigest()
+    return memo[(kind, xref)]
+
+
+def page_fingerprint(pdf, page, settings, memo):
+    """
+    Fingerprint everything a page's markdown is derived from: its content streams, geometry,
+    links, and the fonts, images and form XObjects it references, plus the conversion settings.
+    memo is shared across the pages of one document so shared resources are hashed once.
+    """
+    digest = hashlib.sha256(json.dumps(settings, sort_keys=True).encode("utf-8"))
+    digest.update(page.read_contents())
+    digest.update(f"{tuple(page.rect)}|{page.rotation}".encode("ascii"))
+
+    for link in page.get_links():
+        digest.update(f"{tuple(link['from'])}|{link.get('uri')}".encode("utf-8"))
+    for font in page.get_fonts(full=True):
+        digest.update(f"font|{font[4]}|{font[5]}|{_digest_resource(pdf, font[0], 'font', memo)}".encode("utf-8"))
+    for img in page.get_images(full=True):
+        digest.update(f"image|{img[7]}|{_digest_resource(pdf, img[0], 'image', memo)}".encode("utf-8"))
+    for xobject in page.get_xobjects():
+        digest.update(f"form|{xobject[1]}|{_digest_resource(pdf, xobject[0], 'form', memo)}".encode("utf-8"))
+
+    return digest.hexdigest()
+
+
+def load_fragment_index(fragments_dir):
+    """
+    Return the page fingerprints recorded by the previous incremental run, in page order.
+    """
+    try:
+        with open(os.path.join(fragments_dir, FRAGMENT_INDEX_NAME), "r", encoding="utf-8") as index_file:
+            return json.load(index_file)["pages"]
+    except (OSError, ValueError, KeyError):
+        return []
+
+
+def read_fragment(fragments_dir, fingerprint, images_output_dir):
+    """
+    Return the stored markdown of a page, or None if it is missing or links to an image that no longer exists.
+    """
+    try:
+        with open(os.path.join(fragments_dir, f"{fingerprint}.md"), "r", encoding="utf-8") as fragment_file:
+            page_md = fragment_file.read()
+    except OSError:
+        return None
+
+    for filename in linked_images(page_md):
+        if not os.path.exists(os.path.join(images_output_dir, filename)):
+            return None
+    return page_md
+
+
+def update_pdf_fragments(pdf_path, fragments_dir, images_output_dir, table_detection="auto", ocr="auto",
+                         ocr_dpi=OCR_DPI):
+    """
+    Bring the per-page markdown fragments in fragments_dir up to date with a PDF.
+    Pages whose fingerprint has a stored fragment are reused, wherever they moved to;
+    only the others go through text extraction (or OCR), Camelot and image extraction.
+    Returns (markdown of each page in order, pages reused, pages recomputed).
+    """
+    os.makedirs(fragments_dir, exist_ok=True)
+    os.makedirs(images_output_dir, exist_ok=True)
+    settings = {
+        "converter": CONVERTER_VERSIONS["converters.pdf_converter"],
+        "table_detection": table_detection,
+        "ocr": ocr,
+        "ocr_dpi": ocr_dpi,
+    }
+
+    with open_pdf(pdf_path) as pdf, ImageStore(images_output_dir) as image_store:
+        memo = {}
+        fingerprints = [page_fingerprint(pdf, page, settings, memo) for page in pdf]
+
+        pages_md = [read_fragment(fragments_dir, fingerprint, images_output_dir) for fingerprint in fingerprints]
+        changed = [page_num for page_num, page_md in enumerate(pages_md, start=1) if page_md is None]
+
+        for chunk_start in range(0, len(changed), TABLE_CHUNK_SIZE):
+            page_numbers = changed[chunk_start:chunk_start + TABLE_CHUNK_SIZE]
+            table_pages = select_table_pages(pdf, page_numbers, table_detection)
+            tables_by_page = extract_tables_by_page(pdf_path, table_pages)
+
+            for page_num in page_numbers:
+                page_blocks = convert_page(pdf, pdf[page_num - 1], image_store, tables_by_page.get(page_num, []), ocr,
+                                           ocr_dpi)
+                page_md = "\n\n".join(page_blocks)
+                write_file_atomic(os.path.join(fragments_dir, f"{fingerprints[page_num - 1]}.md"),
+                                  page_md.encode("utf-8"))
+                pages_md[page_num - 1] = page_md
+
+    write_file_atomic(os.path.join(fragments_dir, FRAGMENT_INDEX_NAME),
+                      json.dumps({"pages": fingerprints}).encode("utf-8"))
+
+    # Drop fragments of pages that no longer exist in this revision
+    current = {f"{fingerprint}.md" for fingerprint in fingerprints}
+    for filename in os.listdir(fragments_dir):
+        if filename.endswith(".md") and filename not in current:
+            os.remove(os.path.join(fragments_dir, filename))
+
+    return pages_md, len(pages_md) - len(changed), len(changed)
+
+
+def convert_pdf_to_md_incremental(pdf_path, output_md_path=None, images_output_dir=None, fragments_dir=None,
+                                  table_detection="auto", name=None, ocr="auto", ocr_dpi=OCR_DPI):
+    """
+    Convert a PDF to Markdown, reconverting only the pages that changed since the last run.
+    Per-page fragments and their fingerprints are kept in fragments_dir, by default a
+    '<name>.pages' folder next to output_md_path. The output matches convert_pdf_to_md.
+    Prints how many pages were reused and recomputed.
+    """
+    try:
+        base_name = source_base_name(pdf_path, name)
+        pdf_path = load_source(pdf_path)
+        if images_output_dir is None:
+            images_output_dir = os.path.join("output", "images")
+        if output_md_path is None:
+            output_md_path = os.path.join("output", f"{base_name}.md")
+        if fragments_dir is None:
+            fragments_dir = os.path.splitext(output_md_path)[0] + ".pages"
+
+        pages_md, reused, recomputed = update_pdf_fragments(pdf_path, fragments_dir, images_output_dir,
+                                                            table_detection, ocr, ocr_dpi)
+        print(f"Pages reused: {reused}, recomputed: {recomputed}")
+
+        md_content = "\n\n".join(page_md for page_md in pages_md if page_md)
+        os.makedirs(os.path.dirname(output_md_path) or ".", exist_ok=True)
+        write_file_atomic(output_md_path, md_content.encode("utf-8"))
+        return md_content
+    except MemoryError:
+        # Left to the caller: batch_convert reports it as the worker hitting its memory cap
+        raise
+    except Exception as e:
+        print(f"Error processing PDF: {e}")
+        return None
@@ -1,68 +1,79 @@
 from pptx import Presentation
 from pathlib import Path
-import pandas as pd
-import uuid
 from pptx.enum.shapes import MSO_SHAPE_TYPE
 import os
+from converters.profiling import span_iter
+from converters.utils import ImageStore, format_table_as_markdown, open_source, parse_page_selection, stream_markdown
 
-def convert_pptx_to_md(pptx_path):
+def iter_pptx_slides(pptx_path, images_dir, slides=None):
     """
-    Convert a PPTX file to Markdown and return it as a string.
-    Extracts:
-    - Slide titles and content
-    - Tables (as Markdown)
-    - Images (saved in 'images' folder relative to the PPTX location)
+    Yield the markdown of each slide in order.
+    slides selects the slides to convert (see parse_page_selection); headings keep the original slide numbers.
     """
+    # Load the PPTX
+    if isinstance(pptx_path, Path):
+        pptx_path = str(pptx_path)
+    prs = Presentation(open_source(pptx_path))
+    slide_numbers = parse_page_selection(slides, len(prs.slides))
 
-    pptx_path = Path(pptx_path)
-    output_dir = pptx_path.parent
-    images_dir = output_dir / "images"
-    images_dir.mkdir(parents=True, exist_ok=True)
+    with ImageStore(images_dir) as image_store:
+        for slide_num in slide_numbers:
+            # Unselected slides are never walked, so their shapes and images are not touched
+            slide = prs.slides[slide_num - 1]
+            markdown_lines = [f"# Slide {slide_num}\n"]
 
-    markdown_lines = []
+            for shape in slide.shapes:
+                # Extract text
+                if shape.has_text_frame:
+                    text = shape.text.strip()
+                    if text:
+                        markdown_lines.append(text + "\n")
 
-    # Load the PPTX
-    prs = Presentation(str(pptx_path))
+                # Extract tables
+                elif shape.shape_type == MSO_SHAPE_TYPE.TABLE:
+                    table_data = []
+                    for row in shape.table.rows:
+                        table_data.append([cell.text.strip() or " " for cell in row.cells])
 
-    for slide_num, slide in enumerate(prs.slides, start=1):
-        markdown_lines.append(f"# Slide {slide_num}\n")
+                    markdown_lines.append(format_table_as_markdown(table_data, header=False) + "\n")
 
-        for shape in slide.shapes:
-            # Extract text
-            if shape.has_text_frame:
-                text = shape.text.strip()
-                if text:
-                    markdown_lines.append(text + "\n")
+                # Extract images
+                elif shape.shape_type == MSO_SHAPE_TYPE.PICTURE:
+                    image = shape.image
+                    markdown_lines.append(image_store.add(image.blob, image.ext) + "\n")
 
-            # Extract tables
-            elif shape.shape_type == MSO_SHAPE_TYPE.TABLE:
-                table_data = []
-                for row in shape.table.rows:
-                    table_data.append([cell.text.strip() or " " for cell in row.cells])
+            markdown_lines.append("\n---\n")  # Slide separator
 
-                try:
-                    df = pd.DataFrame(table_data)
-                    md_table = df.to_markdown(index=False, headers=None)
-                except Exception:
-                    md_table = "\n".join(["| " + " | ".join(r) + " |" for r in table_data])
+            yield "\n".join(markdown_lines)
 
-                markdown_lines.append(md_table + "\n")
 
-            # Extract images
-            elif shape.shape_type == MSO_SHAPE_TYPE.PICTURE:
-                image = shape.image
-                image_bytes = image.blob
-                ext = image.ext
-                image_name = f"{uuid.uuid4()}.{ext}"
-                image_path = images_dir / image_name
-                with open(image_path, "wb") as f:
-                    f.write(image_bytes)
-                markdown_lines.append(f"![Image](images/{image_name})\n")
+def iter_pptx_to_md(pptx_path, output_md_path=None, images_output_dir=None, slides=None):
+    """
+    Convert a PPTX file to Markdown one slide at a time.
+    Yields each slide's markdown and, if output_md_path is given, appends it to that file as it goes.
+    pptx_path may also be bytes or a binary file object.
+    """
+    # Like the other converters, never write next to the source (it may be read-only or shared storage)
+    if images_output_dir is None:
+        images_output_dir = os.path.join("output", "images")
+    images_dir = Path(images_output_dir)
+    images_dir.mkdir(parents=True, exist_ok=True)
+
+    slides_md = span_iter("pptx.slides", iter_pptx_slides(pptx_path, images_dir, slides))
+    yield from stream_markdown(slides_md, output_md_path, separator="\n")
 
-        markdown_lines.append("\n---\n")  # Slide separator
 
+def convert_pptx_to_md(pptx_path, output_md_path=None, images_output_dir=None, slides=None):
+    """
+    Convert a PPTX file (path, bytes or binary file object) to Markdown and return it as a string.
+    Extracts:
+    - Slide titles and content
+    - Tables (as Markdown)
+    - Images (saved in images_output_dir, by default output/images)
+    slides limits the conversion to some slides: "1-5", "2,4", "10-", "last 3" or a list of numbers.
+    """
     # Return Markdown content as a string
-    return "\n".join(markdown_lines)
+    return "\n".join(iter_pptx_to_md(pptx_path, output_md_path, images_output_dir, slides))
 
 
 # For standalone testing
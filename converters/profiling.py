@@ -0,0 +1,180 @@
+"""
+Lightweight per-stage timing and memory spans for the converters.
+
+Converters wrap their stages in span() blocks. Spans only record anything while
+a collect_report() block is active in the same context, so they cost a single
+context variable lookup otherwise. Spans nest and their times are inclusive;
+repeated spans with the same name are aggregated (calls, total seconds, summed
+counts, largest peak allocation).
+
+Peak allocation comes from tracemalloc, which slows Python-heavy stages down
+noticeably, so it is only measured with collect_report(trace_memory=True). Only
+allocations made through Python's allocator are seen, and work done in other
+processes (e.g. convert_pdf_to_md with workers > 1) is not recorded.
+"""
+import contextvars
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+_active_report = contextvars.ContextVar("conversion_report", default=None)
+
+
+class Span:
+    """
+    Handle yielded by span(); add to count to record how many items the stage handled.
+    """
+    __slots__ = ("count",)
+
+    def __init__(self, count=0):
+        self.count = count
+
+
+class ConversionReport:
+    """
+    Aggregated spans of one conversion, plus its total time and peak allocation.
+    """
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.spans = {}
+        self.seconds = 0.0
+        self.peak_alloc_bytes = None
+        # [running peak, allocated at start] for every span open while tracing memory
+        self._memory_stack = []
+
+    def _enter_memory(self):
+        if self._memory_stack:
+            # reset_peak() below would lose the enclosing span's peak so far
+            parent = self._memory_stack[-1]
+            parent[0] = max(parent[0], tracemalloc.get_traced_memory()[1])
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        self._memory_stack.append([current, current])
+
+    def _exit_memory(self):
+        running_peak, start = self._memory_stack.pop()
+        peak = max(running_peak, tracemalloc.get_traced_memory()[1])
+        if self._memory_stack:
+            parent = self._memory_stack[-1]
+            parent[0] = max(parent[0], peak)
+        return peak - start
+
+    def record(self, name, seconds, count, peak_alloc_bytes=None):
+        stats = self.spans.get(name)
+        if stats is None:
+            stats = self.spans[name] = {"calls": 0, "seconds": 0.0, "count": 0, "peak_alloc_bytes": None}
+        stats["calls"] += 1
+        stats["seconds"] += seconds
+        stats["count"] += count
+        if peak_alloc_bytes is not None:
+            stats["peak_alloc_bytes"] = max(stats["peak_alloc_bytes"] or 0, peak_alloc_bytes)
+
+    def as_dict(self):
+        """
+        JSON-friendly form: total seconds and peak allocation in MB, then one entry per span name.
+        """
+        def mb(value):
+            return None if value is None else round(value / (1024 * 1024), 3)
+
+        return {
+            "seconds": round(self.seconds, 4),
+            "peak_alloc_mb": mb(self.peak_alloc_bytes),
+            "spans": {
+                name: {
+                    "calls": stats["calls"],
+                    "seconds": round(stats["seconds"], 4),
+                    "count": stats["count"],
+                    "peak_alloc_mb": mb(stats["peak_alloc_bytes"]),
+                }
+                for name, stats in self.spans.items()
+            },
+        }
+
+    def rows(self):
+        """
+        One row per span, slowest first, for display as a table.
+        """
+        return report_rows(self.as_dict())
+
+
+def report_rows(report):
+    """
+    Table rows (header first) for a report in ConversionReport.as_dict() form, slowest span first.
+    """
+    rows = [["stage", "calls", "items", "seconds", "share", "peak alloc (MB)"]]
+    for name, stats in sorted(report["spans"].items(), key=lambda item: -item[1]["seconds"]):
+        share = stats["seconds"] / report["seconds"] if report["seconds"] else 0.0
+        peak = "" if stats["peak_alloc_mb"] is None else f"{stats['peak_alloc_mb']:.2f}"
+        rows.append([name, str(stats["calls"]), str(stats["count"]), f"{stats['seconds']:.3f}", f"{share:.0%}", peak])
+    return rows
+
+
+@contextmanager
+def span(name, count=0):
+    """
+    Time a converter stage (and its peak allocation when tracing) under name.
+    Yields a Span whose count can be increased inside the block.
+    """
+    handle = Span(count)
+    report = _active_report.get()
+    if report is None:
+        yield handle
+        return
+
+    tracing = report.trace_memory and tracemalloc.is_tracing()
+    if tracing:
+        report._enter_memory()
+    start = time.perf_counter()
+    try:
+        yield handle
+    finally:
+        seconds = time.perf_counter() - start
+        peak = report._exit_memory() if tracing else None
+        report.record(name, seconds, handle.count, peak)
+
+
+def span_iter(name, iterable):
+    """
+    Yield from iterable, timing only the work done producing each item (not the consumer's).
+    The span's count is the number of items.
+    """
+    if _active_report.get() is None:
+        yield from iterable
+        return
+
+    iterator = iter(iterable)
+    while True:
+        with span(name) as stage:
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            stage.count += 1
+        yield item
+
+
+@contextmanager
+def collect_report(trace_memory=False):
+    """
+    Record every span run inside the block into a new ConversionReport, which is yielded.
+    trace_memory starts tracemalloc for the block (if it is not already running).
+    """
+    report = ConversionReport(trace_memory)
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    token = _active_report.set(report)
+
+    if trace_memory:
+        report._enter_memory()
+    start = time.perf_counter()
+    try:
+        yield report
+    finally:
+        report.seconds = time.perf_counter() - start
+        if trace_memory:
+            report.peak_alloc_bytes = report._exit_memory()
+        _active_report.reset(token)
+        if started_tracing:
+            tracemalloc.stop()
@@ -1,4 +1,92 @@
+import hashlib
+import io
 import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+from converters.profiling import span
+
+def load_source(source):
+    """
+    Normalise a converter input: paths are returned unchanged, bytes-like data
+    becomes bytes and a binary file object is read into bytes.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return source
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source)
+    if hasattr(source, "read"):
+        return source.read()
+    raise TypeError(f"Unsupported input type: {type(source).__name__}")
+
+
+def open_source(source):
+    """
+    Return something python-docx, python-pptx or zipfile can open:
+    paths and file objects unchanged, bytes-like data wrapped in BytesIO.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    return source
+
+
+def source_base_name(source, name=None):
+    """
+    File name stem used for output files: taken from name, a path,
+    or a file object's .name attribute, and "document" otherwise.
+    """
+    if name is None:
+        if isinstance(source, (str, os.PathLike)):
+            name = source
+        else:
+            name = getattr(source, "name", None)
+    if not isinstance(name, (str, os.PathLike)):
+        return "document"
+    return os.path.splitext(os.path.basename(name))[0] or "document"
+
+
+def parse_page_selection(selection, count):
+    """
+    Resolve a page or slide selection to sorted, 1-based numbers within 1..count.
+    selection may be None or "all" (everything), an int, an iterable of ints, or a string of
+    comma-separated items: "7", "3-9", "12-" (to the end), "last 10".
+    Raises ValueError for malformed selections and numbers outside the document.
+    """
+    if selection is None:
+        return list(range(1, count + 1))
+    if isinstance(selection, int):
+        selection = [selection]
+
+    numbers = set()
+    if isinstance(selection, str):
+        for item in selection.replace(" ", "").lower().split(","):
+            if not item:
+                continue
+            try:
+                if item == "all":
+                    numbers.update(range(1, count + 1))
+                elif item.startswith("last"):
+                    numbers.update(range(max(1, count - int(item[4:]) + 1), count + 1))
+                elif "-" in item:
+                    first, _, end = item.partition("-")
+                    first, end = int(first), int(end) if end else count
+                    if first > end:
+                        raise ValueError()
+                    numbers.update(range(first, end + 1))
+                else:
+                    numbers.add(int(item))
+            except ValueError:
+                raise ValueError(f"Invalid page selection: {item}") from None
+    else:
+        numbers.update(int(number) for number in selection)
+
+    outside = [number for number in numbers if not 1 <= number <= count]
+    if outside:
+        raise ValueError(f"Page {sorted(outside)[-1]} is outside 1-{count}")
+    if not numbers:
+        raise ValueError("The page selection is empty")
+    return sorted(numbers)
+
 
 def save_markdown(content, output_path):
     """
@@ -10,25 +98,93 @@ def save_markdown(content, output_path):
     print(f"Markdown saved to: {output_path}")
 
 
-def format_table_as_markdown(table_data):
+def stream_markdown(chunks, output_path, separator="\n\n"):
+    """
+    Write markdown chunks to output_path as they are produced, passing each one through.
+    The file ends up holding separator.join(chunks) without the whole document in memory.
+    Chunks go to a temporary name that replaces output_path only once every chunk is written,
+    so a conversion that fails or is stopped early leaves any earlier output untouched.
+    If output_path is None, chunks are passed through without writing.
+    """
+    if output_path is None:
+        yield from chunks
+        return
+
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    tmp_path = f"{output_path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for index, chunk in enumerate(chunks):
+                if index:
+                    f.write(separator)
+                f.write(chunk)
+                yield chunk
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+# Separator cell for each column alignment
+TABLE_ALIGN_SEPARATORS = {None: "---", "left": ":---", "right": "---:", "center": ":---:"}
+
+
+def _markdown_cell(cell):
+    """
+    Render one table cell: escape pipes and fold line breaks into spaces.
+    """
+    if cell is None:
+        return ""
+    text = str(cell)
+    if "|" in text:
+        text = text.replace("|", "\\|")
+    if "\n" in text or "\r" in text:
+        text = " ".join(text.splitlines())
+    return text.strip()
+
+
+def format_table_as_markdown(table_data, header=True, align=None):
     """
     Convert a 2D list (table_data) into markdown table format.
     Example:
     [["Name", "Age"], ["John", "30"]]
+
+    - header: use the first row as the header row; when False an empty header row is emitted
+    - align: None, one of "left", "right", "center", or a list with one of those (or None) per column
+    Ragged rows are padded with empty cells to the widest row.
     """
-    if not table_data or not isinstance(table_data, list):
+    if not table_data or not isinstance(table_data, (list, tuple)):
         return ""
 
-    # Create header
-    header = "| " + " | ".join(str(cell) for cell in table_data[0]) + " |"
-    separator = "| " + " | ".join("---" for _ in table_data[0]) + " |"
+    with span("table.render", count=len(table_data)):
+        rows = [[_markdown_cell(cell) for cell in row] for row in table_data]
+        column_count = max(len(row) for row in rows)
+        if column_count == 0:
+            return ""
+        for row in rows:
+            if len(row) < column_count:
+                row.extend([""] * (column_count - len(row)))
 
-    # Create rows
-    rows = []
-    for row in table_data[1:]:
-        rows.append("| " + " | ".join(str(cell) for cell in row) + " |")
+        if align is None or isinstance(align, str):
+            align = [align] * column_count
+        else:
+            align = list(align)[:column_count] + [None] * (column_count - len(align))
+        separator = "| " + " | ".join(TABLE_ALIGN_SEPARATORS[a] for a in align) + " |"
 
-    return "\n".join([header, separator] + rows)
+        # Create header
+        if header:
+            header_row, body_rows = rows[0], rows[1:]
+        else:
+            header_row, body_rows = [""] * column_count, rows
+        lines = ["| " + " | ".join(header_row) + " |", separator]
+
+        # Create rows
+        lines.extend("| " + " | ".join(row) + " |" for row in body_rows)
+
+        return "\n".join(lines)
 
 
 def image_to_markdown(image_path, alt_text="Image"):
@@ -38,6 +194,179 @@ def image_to_markdown(image_path, alt_text="Image"):
     return f"![{alt_text}]({image_path})"
 
 
+# Hex digits of the SHA-256 kept in stored image names
+IMAGE_HASH_LENGTH = 32
+
+# Background threads writing image files (0 writes synchronously)
+IMAGE_WRITER_THREADS = 4
+
+# Image writes allowed in flight before the converter waits for the writer to catch up
+IMAGE_WRITER_QUEUE_SIZE = 64
+
+
+def write_file_atomic(path, data):
+    """
+    Write data to path through a temporary name so readers never see a partial file.
+    """
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "wb") as out_file:
+        out_file.write(data)
+    os.replace(tmp_path, path)
+
+
+class ImageWriter:
+    """
+    Thread pool that writes image files in the background.
+    submit() blocks once queue_size writes are pending; flush() waits for every
+    pending write and raises the first error any of them hit.
+    """
+
+    def __init__(self, threads=None, queue_size=None):
+        if threads is None:
+            threads = IMAGE_WRITER_THREADS
+        if queue_size is None:
+            queue_size = IMAGE_WRITER_QUEUE_SIZE
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="image-writer")
+        self._slots = threading.BoundedSemaphore(queue_size)
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._errors = []
+
+    def submit(self, path, data):
+        self._slots.acquire()
+        future = self._executor.submit(write_file_atomic, path, data)
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._done)
+
+    def _done(self, future):
+        with self._lock:
+            self._pending.discard(future)
+        if future.exception() is not None:
+            self._errors.append(future.exception())
+        self._slots.release()
+
+    def flush(self):
+        with self._lock:
+            pending = list(self._pending)
+        wait(pending)
+        if self._errors:
+            error = self._errors[0]
+            self._errors = []
+            raise error
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+class ImageStore:
+    """
+    Content-addressed image sink shared by the converters.
+    Each unique image is written once to images_dir under a name derived from the SHA-256
+    of its bytes, so repeated images and repeated runs cost no extra writes.
+    A cheap key (PDF xref, DOCX rId, ...) can be given to skip re-reading and re-hashing
+    an image already seen in the same document.
+
+    Writes go through a background ImageWriter unless writer_threads is 0. Use the store
+    as a context manager: leaving the block normally flushes the writer and raises any
+    write error, so the markdown is never returned with missing images.
+    """
+
+    def __init__(self, images_dir, link_prefix="images", writer_threads=None, writer_queue_size=None):
+        self.images_dir = str(images_dir)
+        self.link_prefix = link_prefix
+        self._links_by_key = {}
+        self._filenames = set()
+        os.makedirs(self.images_dir, exist_ok=True)
+
+        if writer_threads is None:
+            writer_threads = IMAGE_WRITER_THREADS
+        self._writer = ImageWriter(writer_threads, writer_queue_size) if writer_threads > 0 else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_type is None:
+                self.flush()
+        finally:
+            self.close()
+
+    def flush(self):
+        """
+        Wait for pending image writes and raise the first write error, if any.
+        """
+        if self._writer is not None:
+            with span("images.write"):
+                self._writer.flush()
+
+    def close(self):
+        """
+        Finish pending image writes and stop the writer threads.
+        """
+        if self._writer is not None:
+            self._writer.close()
+
+    def get(self, key):
+        """
+        Return the markdown link already stored for key, or None.
+        """
+        return self._links_by_key.get(key)
+
+    def _link(self, filename, key, alt_text):
+        self._filenames.add(filename)
+        link = image_to_markdown(f"{self.link_prefix}/{filename}", alt_text)
+        if key is not None:
+            self._links_by_key[key] = link
+        return link
+
+    def add(self, data, ext, key=None, alt_text="Image"):
+        """
+        Store image bytes and return their markdown link.
+        """
+        if key is not None and key in self._links_by_key:
+            return self._links_by_key[key]
+
+        with span("images.write") as stage:
+            filename = f"{hashlib.sha256(data).hexdigest()[:IMAGE_HASH_LENGTH]}.{ext.lower()}"
+            image_path = os.path.join(self.images_dir, filename)
+            if filename not in self._filenames and not os.path.exists(image_path):
+                if self._writer is not None:
+                    self._writer.submit(image_path, data)
+                else:
+                    write_file_atomic(image_path, data)
+                stage.count += 1
+
+        return self._link(filename, key, alt_text)
+
+    def add_stream(self, src, ext, key=None, alt_text="Image"):
+        """
+        Store an image read from a binary file object without holding it in memory whole.
+        The copy is hashed as it is written, so it bypasses the background writer.
+        """
+        if key is not None and key in self._links_by_key:
+            return self._links_by_key[key]
+
+        with span("images.write") as stage:
+            digest = hashlib.sha256()
+            tmp_path = os.path.join(self.images_dir, f"{uuid.uuid4().hex}.tmp")
+            with open(tmp_path, "wb") as img_file:
+                for chunk in iter(lambda: src.read(1024 * 1024), b""):
+                    digest.update(chunk)
+                    img_file.write(chunk)
+
+            filename = f"{digest.hexdigest()[:IMAGE_HASH_LENGTH]}.{ext.lower()}"
+            image_path = os.path.join(self.images_dir, filename)
+            if os.path.exists(image_path):
+                os.remove(tmp_path)
+            else:
+                os.replace(tmp_path, image_path)
+                stage.count += 1
+
+        return self._link(filename, key, alt_text)
+
+
 def sanitize_filename(filename):
     """
     Remove unsafe characters from filenames.
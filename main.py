@@ -1,89 +1,136 @@
 import streamlit as st
 import os
-import tempfile
 import sys
 
 # Ensure the converters folder is in Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "converters")))
 
-# Safe imports
-try:
-    from converters.pdf_converter import convert_pdf_to_md
-except ImportError:
-    convert_pdf_to_md = None
-
-try:
-    from converters.pptx_converter import convert_pptx_to_md
-except ImportError:
-    convert_pptx_to_md = None
-
-try:
-    from converters.image_converter import convert_image_to_md
-except ImportError:
-    convert_image_to_md = None
-
-try:
-    from converters.docx_converter import convert_docx_to_md
-except ImportError:
-    convert_docx_to_md = None
-
-# Streamlit config
-st.set_page_config(page_title="Universal File to Markdown Converter", layout="centered")
-
-st.title("📄 Universal File → Markdown Converter")
-st.write("Drag and drop your file below. Supported formats: **PDF, PPT, PPTX, DOCX, PNG, JPG, JPEG**")
-
-uploaded_file = st.file_uploader(
-    "Drop your file here or click to upload",
-    type=["pdf", "ppt", "pptx", "docx", "png", "jpg", "jpeg"]  # Added pptx explicitly
-)
-
-if uploaded_file:
-    file_ext = uploaded_file.name.split(".")[-1].lower()
-
-    with tempfile.NamedTemporaryFile(delete=False, suffix=f".{file_ext}") as tmp:
-        tmp.write(uploaded_file.read())
-        tmp_path = tmp.name
-
-    st.info(f"Processing `{uploaded_file.name}`... Please wait.")
-
-    try:
-        md_content = None
-
-        if file_ext == "pdf" and convert_pdf_to_md:
-            md_content = convert_pdf_to_md(tmp_path)
-
-        elif file_ext in ["ppt", "pptx"] and convert_pptx_to_md:
-            # Allow .ppt by trying to convert it directly or converting to .pptx internally
-            md_content = convert_pptx_to_md(tmp_path)
-
-        elif file_ext in ["png", "jpg", "jpeg"] and convert_image_to_md:
-            md_content = convert_image_to_md(tmp_path)
-
-        elif file_ext == "docx" and convert_docx_to_md:
-            md_content = convert_docx_to_md(tmp_path)
-
-        else:
-            st.error(f"Unsupported file type or missing converter for `{file_ext}`.")
-
-        if md_content:
-            st.success("✅ Conversion completed!")
-
-            # Markdown preview
-            st.subheader("📜 Markdown Preview")
-            st.markdown(md_content)
-
-            # Download button
+# Converters are imported on first use, so a PNG upload never loads the PDF stack
+from converters.archive import build_archive
+from converters.cache import ResultCache
+from converters.jobs import JobQueue
+from converters.profiling import report_rows
+from converters.utils import format_table_as_markdown
+
+# Where the converters write extracted images when given an upload
+IMAGES_DIR = os.path.join("output", "images")
+
+# How often the job list refreshes while conversions are running
+PROGRESS_REFRESH_SECONDS = 1.0
+
+# Finished jobs whose zip download is kept in memory
+ARCHIVE_CACHE_ENTRIES = 32
+
+
+@st.cache_resource
+def get_job_queue():
+    """
+    One worker pool for every session; it survives reruns, so a rerun never throws work away.
+    Identical uploads are served from the on-disk result cache without reconverting.
+    """
+    return JobQueue(images_dir=IMAGES_DIR, cache=ResultCache())
+
+
+@st.cache_data(max_entries=ARCHIVE_CACHE_ENTRIES, show_spinner=False)
+def job_archive(job_id):
+    """
+    Zip of a finished job's markdown and the images it links to, built once per job.
+    """
+    job = get_job_queue().get(job_id)
+    return build_archive(job.markdown, f"{os.path.splitext(job.name)[0]}.md", IMAGES_DIR)
+
+
+def show_job(job_queue, job):
+    """
+    Render one job: progress and a cancel button while it runs, preview and download once done.
+    """
+    with st.container(border=True):
+        pages = f" · {'slides' if job.file_ext in ('ppt', 'pptx') else 'pages'} {job.pages}" if job.pages else ""
+        st.markdown(f"**{job.name}**{pages} · {job.status}" + (" (from cache)" if job.cached else ""))
+
+        if job.active:
+            unit = "slides" if job.file_ext in ("ppt", "pptx") else "pages" if job.file_ext == "pdf" else "blocks"
+            label = f"{job.done} / {job.total} {unit}" if job.total else f"{job.done} {unit}"
+            st.progress(job.progress or 0.0, text=label)
+            st.button("Cancel", key=f"cancel-{job.id}", on_click=job_queue.cancel, args=(job.id,))
+
+        elif job.status == "done":
+            # Download buttons: the markdown with its images, or the markdown alone
+            st.download_button(
+                label="🗜️ Download Markdown + Images (.zip)",
+                data=job_archive(job.id),
+                file_name=f"{os.path.splitext(job.name)[0]}.zip",
+                mime="application/zip",
+                key=f"download-zip-{job.id}"
+            )
             st.download_button(
                 label="💾 Download Markdown File",
-                data=md_content.encode("utf-8"),
-                file_name=f"{os.path.splitext(uploaded_file.name)[0]}.md",
-                mime="text/markdown"
+                data=job.markdown.encode("utf-8"),
+                file_name=f"{os.path.splitext(job.name)[0]}.md",
+                mime="text/markdown",
+                key=f"download-{job.id}"
             )
 
-    except Exception as e:
-        st.error(f"❌ Error: {str(e)}")
-
-    finally:
-        if os.path.exists(tmp_path):
-            os.remove(tmp_path)
+            # Markdown preview
+            with st.expander("📜 Markdown Preview"):
+                st.markdown(job.markdown)
+
+            if job.report:
+                with st.expander(f"⏱️ Conversion report ({job.report['seconds']:.2f}s)"):
+                    st.markdown(format_table_as_markdown(report_rows(job.report)))
+                    st.json(job.report, expanded=False)
+
+        elif job.status == "failed":
+            st.error(f"❌ Error: {job.error}")
+
+
+def main():
+    # Streamlit config
+    st.set_page_config(page_title="Universal File to Markdown Converter", layout="centered")
+
+    st.title("📄 Universal File → Markdown Converter")
+    st.write("Drag and drop your files below. Supported formats: **PDF, PPT, PPTX, DOCX, PNG, JPG, JPEG**")
+
+    uploaded_files = st.file_uploader(
+        "Drop your files here or click to upload",
+        type=["pdf", "ppt", "pptx", "docx", "png", "jpg", "jpeg"],  # Added pptx explicitly
+        accept_multiple_files=True
+    )
+    selection = st.text_input(
+        "Pages / slides to convert (PDF, PPTX)",
+        placeholder="All, or e.g. 1-20, 35, 40-, last 5"
+    ).strip() or None
+    trace_memory = st.checkbox("Measure peak memory per stage (slower)")
+
+    job_queue = get_job_queue()
+    if "job_ids" not in st.session_state:
+        st.session_state.job_ids = []
+        st.session_state.submitted_files = {}
+
+    # Each upload is submitted once per selection; reruns only redraw the job list
+    for uploaded_file in uploaded_files or []:
+        if (uploaded_file.file_id, selection) not in st.session_state.submitted_files:
+            # Converters read the upload straight from memory, no temp file round trip
+            job = job_queue.submit(uploaded_file.getvalue(), uploaded_file.name, trace_memory=trace_memory,
+                                   pages=selection)
+            st.session_state.submitted_files[(uploaded_file.file_id, selection)] = job.id
+            st.session_state.job_ids.append(job.id)
+
+    session_jobs = job_queue.jobs(st.session_state.job_ids)
+    any_active = any(job.active for job in session_jobs)
+
+    @st.fragment(run_every=PROGRESS_REFRESH_SECONDS if any_active else None)
+    def show_jobs():
+        jobs = job_queue.jobs(st.session_state.job_ids)
+        if jobs and not any(job.active for job in jobs) and any_active:
+            # Everything finished since the last full run; rerun once to stop polling
+            st.rerun()
+        for job in reversed(jobs):
+            show_job(job_queue, job)
+
+    show_jobs()
+
+
+# Spawned worker processes import this script as __mp_main__; only Streamlit's run executes the app
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+Headless HTTP conversion service for ingestion pipelines.
+
+Runs the converters behind a small HTTP API on localhost, using a pre-warmed
+JobQueue (converters/jobs.py) so the first request does not pay for imports.
+At most --max-pending conversions are queued or running; further requests are
+answered with 429 and a Retry-After header instead of piling up.
+
+Endpoints:
+    POST /convert?name=report.pdf            body: the document's bytes
+        -> application/zip with report.md and images/..., the default
+    POST /convert?name=report.pdf&archive=tar.gz  (or archive=tar)
+        -> the same as a tar archive
+    POST /convert?name=report.pdf&stream=1
+        -> text/markdown, sent page by page (chunked) as pages are converted
+    POST /convert?name=manual.pdf&pages=120-135    (or slides=1-5 for a PPTX)
+        -> only the selected pages or slides: "1-20", "3,7,9-12", "40-", "last 5"
+    GET  /health
+        -> JSON with worker count, pending jobs and which backends are installed (e.g. OCR for scanned PDFs)
+
+Usage:
+    python serve.py
+    python serve.py --port 8080 --workers 4 --max-pending 16
+    curl --data-binary @report.pdf "http://127.0.0.1:8000/convert?name=report.pdf" -o report.zip
+"""
+import argparse
+import json
+import os
+import queue
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from converters import (CONVERTERS, PAGE_ITERATORS, available_backends, available_optional_backends, page_selector,
+                        supported_formats)
+from converters.archive import ARCHIVE_FORMATS, ARCHIVE_SUFFIXES, build_archive
+from converters.cache import ResultCache
+from converters.jobs import JobQueue, QueueFull, count_units
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8000
+DEFAULT_MAX_PENDING = 8
+DEFAULT_MAX_UPLOAD_MB = 200
+DEFAULT_JOB_TIMEOUT = 600
+
+# Seconds a client is asked to wait after a 429
+RETRY_AFTER_SECONDS = 2
+
+ARCHIVE_CONTENT_TYPES = {"zip": "application/zip", "tar": "application/x-tar", "tar.gz": "application/gzip"}
+
+
+class ConversionHandler(BaseHTTPRequestHandler):
+    """
+    Request handler; the JobQueue and limits live on the server object.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def send_json(self, status, payload, headers=None, close=False):
+        """
+        Send a JSON reply. close=True ends the connection afterwards, for replies sent before the
+        request body was read: on a keep-alive connection the unread body would be parsed as the next request.
+        """
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        if close:
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if urlparse(self.path).path != "/health":
+            self.send_json(404, {"error": "Not found"})
+            return
+        job_queue = self.server.job_queue
+        self.send_json(200, {
+            "status": "ok",
+            "workers": job_queue.workers,
+            "pending": job_queue.pending_count(),
+            "max_pending": job_queue.max_pending,
+            "formats": supported_formats(),
+            # Whether each format's backends are installed, and those only some conversions need (PDF OCR)
+            "backends": available_backends(),
+            "optional_backends": available_optional_backends(),
+        })
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/convert":
+            self.send_json(404, {"error": "Not found"}, close=True)
+            return
+
+        query = parse_qs(url.query)
+        name = query.get("name", [self.headers.get("X-Filename", "")])[0]
+        file_ext = query.get("format", [os.path.splitext(name)[1]])[0].lower().lstrip(".")
+        if file_ext not in CONVERTERS:
+            self.send_json(400, {"error": f"Unsupported format: {file_ext or 'unknown'}",
+                                 "formats": supported_formats()}, close=True)
+            return
+        name = name or f"document.{file_ext}"
+
+        length = self.headers.get("Content-Length")
+        if length is None:
+            self.send_json(411, {"error": "Content-Length required"}, close=True)
+            return
+        if not length.strip().isdigit():
+            self.send_json(400, {"error": f"Invalid Content-Length: {length}"}, close=True)
+            return
+        length = int(length)
+        if length > self.server.max_upload_bytes:
+            self.send_json(413, {"error": "Document too large"}, close=True)
+            return
+        data = self.rfile.read(length)
+
+        stream = query.get("stream", ["0"])[0] in ("1", "true")
+        archive_format = query.get("archive", ["zip"])[0]
+        if archive_format not in ARCHIVE_FORMATS:
+            self.send_json(400, {"error": f"Unknown archive format: {archive_format}", "archives": ARCHIVE_FORMATS})
+            return
+        pages = query.get("pages", query.get("slides", [None]))[0]
+        if pages is not None and page_selector(file_ext):
+            # Reject a bad selection here rather than as a failed conversion
+            try:
+                count_units(file_ext, data, pages)
+            except ValueError as e:
+                self.send_json(400, {"error": str(e)})
+                return
+            except Exception:
+                # A corrupt PDF or PPTX; no worker could convert it either
+                self.send_json(400, {"error": "Could not open document"})
+                return
+        try:
+            job = self.server.job_queue.submit(data, name, file_ext, stream=stream, pages=pages)
+        except QueueFull as e:
+            self.send_json(429, {"error": str(e)}, {"Retry-After": str(RETRY_AFTER_SECONDS)})
+            return
+
+        try:
+            if stream:
+                self.stream_markdown(job)
+            else:
+                self.send_archive(job, archive_format)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client went away; discard() below cancels the conversion if it is still running
+            self.close_connection = True
+        finally:
+            self.server.job_queue.discard(job.id)
+
+    def send_archive(self, job, archive_format="zip"):
+        if not job.wait(self.server.job_timeout):
+            self.server.job_queue.cancel(job.id)
+            self.send_json(504, {"error": "Conversion timed out"})
+            return
+        if job.status != "done":
+            self.send_json(500, {"error": job.error or job.status})
+            return
+
+        stem = os.path.splitext(os.path.basename(job.name))[0]
+        body = build_archive(job.markdown, f"{stem}.md", self.server.job_queue.images_dir, archive_format)
+        self.send_response(200)
+        self.send_header("Content-Type", ARCHIVE_CONTENT_TYPES[archive_format])
+        self.send_header("Content-Disposition", f'attachment; filename="{stem}{ARCHIVE_SUFFIXES[archive_format]}"')
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def stream_markdown(self, job):
+        module_name = CONVERTERS[job.file_ext][0]
+        separator = PAGE_ITERATORS.get(module_name, ("", "\n\n"))[1]
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/markdown; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        first = True
+        while True:
+            try:
+                chunk = job.chunks.get(timeout=self.server.job_timeout)
+            except queue.Empty:
+                chunk = None
+            if chunk is None:
+                break
+            data = ((separator if not first else "") + chunk).encode("utf-8")
+            first = False
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+        if not job.wait(self.server.job_timeout):
+            self.server.job_queue.cancel(job.id)
+        if job.status != "done":
+            # Leave the chunked body unterminated so the client sees the response as incomplete
+            self.close_connection = True
+            return
+        self.wfile.write(b"0\r\n\r\n")
+
+
+def make_server(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=None, max_pending=DEFAULT_MAX_PENDING,
+                max_upload_mb=DEFAULT_MAX_UPLOAD_MB, job_timeout=DEFAULT_JOB_TIMEOUT, use_cache=True, quiet=False):
+    """
+    Build the HTTP server and its pre-warmed JobQueue; call serve_forever() on the result.
+    """
+    server = ThreadingHTTPServer((host, port), ConversionHandler)
+    server.daemon_threads = True
+    server.job_queue = JobQueue(workers=workers, max_pending=max_pending,
+                                cache=ResultCache() if use_cache else None, warm=supported_formats())
+    server.max_upload_bytes = max_upload_mb * 1024 * 1024
+    server.job_timeout = job_timeout
+    server.quiet = quiet
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the converters over HTTP on localhost")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--max-pending", type=int, default=DEFAULT_MAX_PENDING,
+                        help="queued plus running conversions before requests get 429")
+    parser.add_argument("--max-upload-mb", type=int, default=DEFAULT_MAX_UPLOAD_MB)
+    parser.add_argument("--job-timeout", type=int, default=DEFAULT_JOB_TIMEOUT, help="seconds to wait for a result")
+    parser.add_argument("--no-cache", action="store_true", help="always convert, bypassing the result cache")
+    parser.add_argument("--quiet", action="store_true", help="do not log every request")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.workers, args.max_pending, args.max_upload_mb,
+                         args.job_timeout, not args.no_cache, args.quiet)
+    print(f"Serving on http://{args.host}:{args.port} with {server.job_queue.workers} worker(s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.job_queue.shutdown()
+
+
+if __name__ == "__main__":
+    main()